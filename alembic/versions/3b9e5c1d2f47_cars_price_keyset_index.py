@@ -0,0 +1,29 @@
+"""Cars price keyset index
+
+Revision ID: 3b9e5c1d2f47
+Revises: 74ef14d837a7
+Create Date: 2026-10-18 09:12:41.503218
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3b9e5c1d2f47'
+down_revision: Union[str, Sequence[str], None] = '74ef14d837a7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        'ix_cars_price_id', 'cars', ['price', 'id'], unique=False
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_cars_price_id', table_name='cars')
@@ -0,0 +1,39 @@
+"""Trigram name indexes
+
+Revision ID: 4a7e2d9c5b61
+Revises: 9d4f1b6a2c83
+Create Date: 2026-10-18 18:21:55.630217
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4a7e2d9c5b61'
+down_revision: Union[str, Sequence[str], None] = '9d4f1b6a2c83'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    op.create_index(
+        'ix_cars_name_trgm', 'cars', ['name'], unique=False,
+        postgresql_using='gin',
+        postgresql_ops={'name': 'gin_trgm_ops'}
+    )
+    op.create_index(
+        'ix_manufacturers_name_trgm', 'manufacturers', ['name'],
+        unique=False,
+        postgresql_using='gin',
+        postgresql_ops={'name': 'gin_trgm_ops'}
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_manufacturers_name_trgm', table_name='manufacturers')
+    op.drop_index('ix_cars_name_trgm', table_name='cars')
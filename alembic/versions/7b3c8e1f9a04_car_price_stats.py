@@ -0,0 +1,139 @@
+"""Car price stats
+
+Revision ID: 7b3c8e1f9a04
+Revises: 4a7e2d9c5b61
+Create Date: 2026-10-18 20:07:13.402785
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7b3c8e1f9a04'
+down_revision: Union[str, Sequence[str], None] = '4a7e2d9c5b61'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'car_price_stats',
+        sa.Column('manufacturer_id', sa.Integer(), nullable=False),
+        sa.Column(
+            'color',
+            sqlmodel.sql.sqltypes.AutoString(length=50),
+            nullable=False
+        ),
+        sa.Column('cars', sa.Integer(), nullable=False),
+        sa.Column(
+            'price_total', sa.Numeric(precision=20, scale=2), nullable=False
+        ),
+        sa.Column(
+            'price_min', sa.Numeric(precision=11, scale=2), nullable=False
+        ),
+        sa.Column(
+            'price_max', sa.Numeric(precision=11, scale=2), nullable=False
+        ),
+        sa.PrimaryKeyConstraint('manufacturer_id', 'color')
+    )
+    op.execute('LOCK TABLE cars IN SHARE MODE')
+    op.execute('''
+    INSERT INTO car_price_stats
+        (manufacturer_id, color, cars, price_total, price_min, price_max)
+    SELECT manufacturer_id, color, count(*), sum(price),
+        min(price), max(price)
+    FROM cars
+    GROUP BY manufacturer_id, color
+    ''')
+    op.execute('''
+    CREATE OR REPLACE FUNCTION car_price_stats_add() RETURNS trigger
+    LANGUAGE plpgsql AS $$
+    BEGIN
+        INSERT INTO car_price_stats AS stats
+            (manufacturer_id, color, cars, price_total, price_min, price_max)
+        SELECT manufacturer_id, color, count(*), sum(price),
+            min(price), max(price)
+        FROM new_rows
+        GROUP BY manufacturer_id, color
+        ORDER BY manufacturer_id, color
+        ON CONFLICT (manufacturer_id, color) DO UPDATE SET
+            cars = stats.cars + excluded.cars,
+            price_total = stats.price_total + excluded.price_total,
+            price_min = least(stats.price_min, excluded.price_min),
+            price_max = greatest(stats.price_max, excluded.price_max);
+        RETURN NULL;
+    END
+    $$
+    ''')
+    op.execute('''
+    CREATE OR REPLACE FUNCTION car_price_stats_remove() RETURNS trigger
+    LANGUAGE plpgsql AS $$
+    BEGIN
+        UPDATE car_price_stats AS stats SET
+            cars = stats.cars - removed.cars,
+            price_total = stats.price_total - removed.price_total,
+            price_min = CASE WHEN removed.price_min > stats.price_min
+                THEN stats.price_min
+                ELSE coalesce((
+                    SELECT min(cars.price) FROM cars
+                    WHERE cars.manufacturer_id = stats.manufacturer_id
+                    AND cars.color = stats.color
+                ), stats.price_min) END,
+            price_max = CASE WHEN removed.price_max < stats.price_max
+                THEN stats.price_max
+                ELSE coalesce((
+                    SELECT max(cars.price) FROM cars
+                    WHERE cars.manufacturer_id = stats.manufacturer_id
+                    AND cars.color = stats.color
+                ), stats.price_max) END
+        FROM (
+            SELECT manufacturer_id, color, count(*) AS cars,
+                sum(price) AS price_total,
+                min(price) AS price_min, max(price) AS price_max
+            FROM old_rows
+            GROUP BY manufacturer_id, color
+        ) AS removed
+        WHERE stats.manufacturer_id = removed.manufacturer_id
+        AND stats.color = removed.color;
+
+        DELETE FROM car_price_stats WHERE cars <= 0;
+        RETURN NULL;
+    END
+    $$
+    ''')
+    op.execute('''
+    CREATE TRIGGER cars_price_stats_insert AFTER INSERT ON cars
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION car_price_stats_add()
+    ''')
+    op.execute('''
+    CREATE TRIGGER cars_price_stats_update_new AFTER UPDATE ON cars
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION car_price_stats_add()
+    ''')
+    op.execute('''
+    CREATE TRIGGER cars_price_stats_update_old AFTER UPDATE ON cars
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION car_price_stats_remove()
+    ''')
+    op.execute('''
+    CREATE TRIGGER cars_price_stats_delete AFTER DELETE ON cars
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION car_price_stats_remove()
+    ''')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute('DROP TRIGGER cars_price_stats_delete ON cars')
+    op.execute('DROP TRIGGER cars_price_stats_update_old ON cars')
+    op.execute('DROP TRIGGER cars_price_stats_update_new ON cars')
+    op.execute('DROP TRIGGER cars_price_stats_insert ON cars')
+    op.execute('DROP FUNCTION car_price_stats_remove()')
+    op.execute('DROP FUNCTION car_price_stats_add()')
+    op.drop_table('car_price_stats')
@@ -0,0 +1,49 @@
+"""Cars filter and sort indexes
+
+Revision ID: 9d4f1b6a2c83
+Revises: e5a27c9b3f18
+Create Date: 2026-10-18 16:40:12.284903
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9d4f1b6a2c83'
+down_revision: Union[str, Sequence[str], None] = 'e5a27c9b3f18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        'ix_cars_name_id', 'cars', ['name', 'id'], unique=False
+    )
+    op.create_index(
+        'ix_cars_color_price_id', 'cars', ['color', 'price', 'id'],
+        unique=False
+    )
+    op.create_index(
+        'ix_cars_manufacturer_id_price_id', 'cars',
+        ['manufacturer_id', 'price', 'id'], unique=False
+    )
+    # single column indexes are prefixes of the composite ones above
+    op.drop_index(op.f('ix_cars_manufacturer_id'), table_name='cars')
+    op.drop_index(op.f('ix_cars_color'), table_name='cars')
+    op.drop_index(op.f('ix_cars_name'), table_name='cars')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_index(op.f('ix_cars_name'), 'cars', ['name'], unique=False)
+    op.create_index(op.f('ix_cars_color'), 'cars', ['color'], unique=False)
+    op.create_index(
+        op.f('ix_cars_manufacturer_id'), 'cars', ['manufacturer_id'],
+        unique=False
+    )
+    op.drop_index('ix_cars_manufacturer_id_price_id', table_name='cars')
+    op.drop_index('ix_cars_color_price_id', table_name='cars')
+    op.drop_index('ix_cars_name_id', table_name='cars')
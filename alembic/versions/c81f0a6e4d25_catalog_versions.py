@@ -0,0 +1,42 @@
+"""Catalog versions
+
+Revision ID: c81f0a6e4d25
+Revises: 3b9e5c1d2f47
+Create Date: 2026-10-18 11:03:27.118940
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c81f0a6e4d25'
+down_revision: Union[str, Sequence[str], None] = '3b9e5c1d2f47'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    catalog_versions = op.create_table(
+        'catalog_versions',
+        sa.Column(
+            'name',
+            sqlmodel.sql.sqltypes.AutoString(length=50),
+            nullable=False
+        ),
+        sa.Column('version', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('name')
+    )
+    op.bulk_insert(catalog_versions, [
+        {'name': 'cars', 'version': 0},
+        {'name': 'manufacturers', 'version': 0},
+    ])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('catalog_versions')
@@ -0,0 +1,30 @@
+"""Cars manufacturer_id index
+
+Revision ID: e5a27c9b3f18
+Revises: c81f0a6e4d25
+Create Date: 2026-10-18 14:03:27.915446
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5a27c9b3f18'
+down_revision: Union[str, Sequence[str], None] = 'c81f0a6e4d25'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        op.f('ix_cars_manufacturer_id'), 'cars', ['manufacturer_id'],
+        unique=False
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_cars_manufacturer_id'), table_name='cars')
@@ -0,0 +1,116 @@
+'''Cold start benchmark: import time and time to first request
+
+Usage:
+    python -m src.benchmarks.cold_start --runs 5
+    DEBUG=false OPENAPI_FILE=openapi.json python -m src.benchmarks.cold_start
+
+Every run starts fresh interpreters in the current environment: one
+importing src.main, and one serving the app with uvicorn, polled until
+GET /health/live answers. The first /openapi.json request of the server
+is timed as well. Reports medians in milliseconds as JSON.
+'''
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+from urllib.error import URLError
+
+
+IMPORT_SCRIPT = '''
+import time
+start = time.perf_counter()
+import src.main
+print(time.perf_counter() - start)
+'''
+
+
+def import_time() -> float:
+    '''Seconds to import the app in a fresh interpreter'''
+    output = subprocess.run(
+        [sys.executable, '-c', IMPORT_SCRIPT],
+        check=True,
+        capture_output=True,
+        text=True
+    ).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def get(url: str) -> bool:
+    '''Whether GET of url succeeds'''
+    try:
+        with urllib.request.urlopen(url, timeout=1) as response:
+            response.read()
+            return response.status == 200
+    except (URLError, ConnectionError):
+        return False
+
+
+def first_requests(port: int, timeout: float) -> tuple[float, float]:
+    '''Seconds from process start to first answer, first schema request'''
+    base_url = f'http://127.0.0.1:{port}'
+    env = {**os.environ, 'WARMUP': 'false', 'WORKERS': '1'}
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [
+            sys.executable, '-m', 'uvicorn', 'src.main:app',
+            '--port', str(port), '--log-level', 'warning'
+        ],
+        env=env
+    )
+
+    try:
+        while not get(f'{base_url}/health/live'):
+            if time.perf_counter() - start > timeout:
+                raise TimeoutError('server did not start')
+            time.sleep(0.005)
+        first_request = time.perf_counter() - start
+
+        schema_start = time.perf_counter()
+        get(f'{base_url}/openapi.json')
+        first_schema = time.perf_counter() - schema_start
+    finally:
+        server.terminate()
+        server.wait()
+
+    return first_request, first_schema
+
+
+def median_ms(values: list[float]) -> float:
+    '''Median of seconds in milliseconds'''
+    return round(statistics.median(values) * 1000, 1)
+
+
+def main(args: argparse.Namespace) -> dict:
+    '''Run benchmark and build report'''
+    imports = [import_time() for _ in range(args.runs)]
+    served = [
+        first_requests(args.port, args.timeout) for _ in range(args.runs)
+    ]
+
+    return {
+        'config': {
+            'runs': args.runs,
+            'debug': os.getenv('DEBUG', 'default'),
+            'openapi_file': os.getenv('OPENAPI_FILE', ''),
+        },
+        'import_ms': median_ms(imports),
+        'first_request_ms': median_ms([first for first, _ in served]),
+        'first_openapi_ms': median_ms([schema for _, schema in served]),
+    }
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    '''Command line options'''
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--port', type=int, default=8099)
+    parser.add_argument('--timeout', type=float, default=30)
+    return parser.parse_args(argv)
+
+
+if __name__ == '__main__':
+    print(json.dumps(main(parse_args()), indent=2))
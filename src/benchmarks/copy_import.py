@@ -0,0 +1,129 @@
+'''Benchmark of ORM row by row inserts against COPY based CSV import
+
+Usage: python -m src.benchmarks.copy_import --rows 100000 --orm-rows 2000
+
+Runs against PostgreSQL with applied migrations and removes the rows it
+created afterwards.
+'''
+import argparse
+import asyncio
+import json
+import random
+import string
+import time
+from typing import AsyncIterator
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, \
+                                    create_async_engine
+from ..importer import import_cars_csv
+from ..models import Car, Manufacturer
+from ..settings import settings
+
+
+MANUFACTURERS = [f'bench-{letter}' for letter in string.ascii_lowercase]
+COLORS = ['red', 'blue', 'white', 'black', 'green']
+
+
+def generate_rows(count: int) -> list[tuple[str, str, str, str]]:
+    '''Synthetic cars as CSV ready tuples'''
+    return [
+        (
+            f'model-{index}',
+            random.choice(COLORS),
+            f'{random.randint(1000, 100000)}.{random.randint(0, 99):02}',
+            random.choice(MANUFACTURERS)
+        )
+        for index in range(count)
+    ]
+
+
+async def csv_lines(rows) -> AsyncIterator[str]:
+    '''Render rows as CSV lines'''
+    yield 'name,color,price,manufacturer_name'
+    for row in rows:
+        yield ','.join(row)
+
+
+async def orm_insert(session: AsyncSession, rows) -> None:
+    '''Insert cars one by one the way create_car does'''
+    result = await session.execute(
+        select(Manufacturer.name, Manufacturer.id)
+        .where(Manufacturer.name.in_(MANUFACTURERS))
+    )
+    manufacturer_ids = dict(result.all())
+
+    for name, color, price, manufacturer_name in rows:
+        session.add(Car(
+            name=name,
+            color=color,
+            price=price,
+            manufacturer_id=manufacturer_ids[manufacturer_name]
+        ))
+        await session.commit()
+
+
+async def cleanup(session: AsyncSession) -> None:
+    '''Remove benchmark cars and manufacturers'''
+    manufacturer_ids = select(Manufacturer.id).where(
+        Manufacturer.name.in_(MANUFACTURERS)
+    )
+    await session.execute(
+        delete(Car).where(Car.manufacturer_id.in_(manufacturer_ids))
+    )
+    await session.execute(
+        delete(Manufacturer).where(Manufacturer.name.in_(MANUFACTURERS))
+    )
+    await session.commit()
+
+
+async def main(url: str, rows: int, orm_rows: int) -> dict:
+    '''Time both import paths and report rows per second'''
+    engine = create_async_engine(url)
+    session_maker = async_sessionmaker(engine, expire_on_commit=False)
+    report = {}
+
+    try:
+        async with session_maker() as session:
+            start = time.perf_counter()
+            result = await import_cars_csv(
+                session, csv_lines(generate_rows(rows))
+            )
+            elapsed = time.perf_counter() - start
+            report['copy'] = {
+                'rows': result['created'],
+                'seconds': round(elapsed, 3),
+                'rows_per_second': round(result['created'] / elapsed)
+            }
+
+        async with session_maker() as session:
+            start = time.perf_counter()
+            await orm_insert(session, generate_rows(orm_rows))
+            elapsed = time.perf_counter() - start
+            report['orm'] = {
+                'rows': orm_rows,
+                'seconds': round(elapsed, 3),
+                'rows_per_second': round(orm_rows / elapsed)
+            }
+
+        report['speedup'] = round(
+            report['copy']['rows_per_second']
+            / report['orm']['rows_per_second'], 1
+        )
+    finally:
+        async with session_maker() as session:
+            await cleanup(session)
+        await engine.dispose()
+
+    return report
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', default=settings.database_url)
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--orm-rows', type=int, default=2000)
+    args = parser.parse_args()
+    print(json.dumps(
+        asyncio.run(main(args.url, args.rows, args.orm_rows)),
+        indent=2
+    ))
@@ -0,0 +1,103 @@
+'''Benchmark of pydantic page serialization against the fast path
+
+Usage: python -m src.benchmarks.serialization --rows 1000 10000 100000
+
+Times encoding of a /cars page the way FastAPI does it with
+response_model and the way FAST_SERIALIZATION does it, no database
+needed. Both outputs are checked to be the same bytes.
+'''
+import argparse
+import asyncio
+import json
+import random
+import time
+from decimal import Decimal
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+from ..models import CarPage, CarPublic
+from ..serialization import page_json
+
+
+COLORS = ['red', 'blue', 'white', 'black', 'green']
+CAR_FIELDS = tuple(CarPublic.model_fields)
+
+
+def generate_rows(count: int) -> list[tuple]:
+    '''Synthetic rows shaped like the /cars query result'''
+    return [
+        (
+            f'model-{index}',
+            random.choice(COLORS),
+            Decimal(f'{random.randint(1000, 100000)}.{index % 100:02}'),
+            index,
+            index % 50 + 1,
+            f'manufacturer-{index % 50}'
+        )
+        for index in range(1, count + 1)
+    ]
+
+
+async def pydantic_path(field, rows: list[tuple]) -> bytes:
+    '''Build models and let FastAPI validate and encode them'''
+    page = CarPage(
+        items=[
+            CarPublic.model_validate(dict(zip(CAR_FIELDS, row)))
+            for row in rows
+        ],
+        next_cursor=None
+    )
+    content = await serialize_response(field=field, response_content=page)
+    return JSONResponse(content).body
+
+
+async def fast_path(rows: list[tuple]) -> bytes:
+    '''Encode rows straight to JSON'''
+    return page_json(CarPublic, rows, None)
+
+
+async def measure(coroutine, repeat: int) -> tuple[float, bytes]:
+    '''Best time of several runs and the produced body'''
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        body = await coroutine()
+        best = min(best, time.perf_counter() - start)
+    return best, body
+
+
+async def main(sizes: list[int], repeat: int) -> dict:
+    '''Time both paths for each page size'''
+    field = create_model_field('Response', CarPage, mode='serialization')
+    report = {}
+
+    for size in sizes:
+        rows = generate_rows(size)
+        slow, slow_body = await measure(
+            lambda: pydantic_path(field, rows), repeat
+        )
+        fast, fast_body = await measure(lambda: fast_path(rows), repeat)
+
+        if slow_body != fast_body:
+            raise AssertionError(f'outputs differ at {size} rows')
+
+        report[size] = {
+            'pydantic_ms': round(slow * 1000, 2),
+            'fast_ms': round(fast * 1000, 2),
+            'speedup': round(slow / fast, 1)
+        }
+
+    return report
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        '--rows', type=int, nargs='+', default=[1000, 10000, 100000]
+    )
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    print(json.dumps(
+        asyncio.run(main(args.rows, args.repeat)),
+        indent=2
+    ))
@@ -0,0 +1,266 @@
+'''Caching module'''
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Iterable
+from .settings import settings
+
+
+logger = logging.getLogger(__name__)
+
+
+class LRUCache:
+    '''Bounded least recently used cache with per-entry expiry
+
+    Not shared between processes, so entries may stay stale in other
+    workers for up to ttl seconds after invalidation.
+    '''
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[Hashable, tuple[Any, float]] = \
+            OrderedDict()
+
+    def get(self, key: Hashable) -> Any | None:
+        '''Return cached value or None if missing or expired'''
+        entry = self._entries.get(key)
+
+        if entry is None or entry[1] < time.monotonic():
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def set(self, key: Hashable, value: Any) -> None:
+        '''Store value, evicting least recently used entry when full'''
+        self._entries[key] = (value, time.monotonic() + self.ttl)
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+
+    def invalidate(self, *keys: Hashable) -> None:
+        '''Drop given keys'''
+        for key in keys:
+            self._entries.pop(key, None)
+
+    def invalidate_value(self, value: Any) -> None:
+        '''Drop all keys currently mapped to value'''
+        self.invalidate(*[
+            key for key, (cached, _) in self._entries.items()
+            if cached == value
+        ])
+
+    def clear(self) -> None:
+        '''Drop all entries and reset counters'''
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self) -> dict[str, int]:
+        '''Size and hit/miss counters'''
+        return {
+            'size': len(self._entries),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses
+        }
+
+
+# lower bound of the delay before an invalidation is repeated
+MIN_REPEAT_DELAY = 1.0
+
+
+def car_key(car_id: int) -> str:
+    '''Response cache key of single car'''
+    return f'car:{car_id}'
+
+
+def manufacturer_key(manufacturer_id: int) -> str:
+    '''Response cache key of single manufacturer'''
+    return f'manufacturer:{manufacturer_id}'
+
+
+def manufacturer_cars_tag(manufacturer_id: int) -> str:
+    '''Tag of cached cars embedding the manufacturer name'''
+    return f'manufacturer:{manufacturer_id}:cars'
+
+
+class MemoryBackend:
+    '''Response cache backend holding entries in process memory'''
+    def __init__(self, maxsize: int, ttl: float):
+        self.entries = LRUCache(maxsize=maxsize, ttl=ttl)
+        self.tags: dict[str, set[str]] = {}
+
+    async def get(self, key: str) -> bytes | None:
+        '''Return cached body'''
+        return self.entries.get(key)
+
+    async def set(
+        self,
+        key: str,
+        value: bytes,
+        tags: Iterable[str] = ()
+    ) -> None:
+        '''Store body, tags group keys for invalidation together'''
+        self.entries.set(key, value)
+        for tag in tags:
+            keys = self.tags.setdefault(tag, set())
+            keys.add(key)
+            if len(keys) > self.entries.maxsize:
+                keys.intersection_update(
+                    tagged for tagged in keys if tagged in self.entries
+                )
+
+    async def delete(self, *keys: str) -> None:
+        '''Drop given keys'''
+        self.entries.invalidate(*keys)
+
+    async def invalidate_tag(self, tag: str) -> None:
+        '''Drop every key stored with the tag'''
+        self.entries.invalidate(*self.tags.pop(tag, ()))
+
+    async def clear(self) -> None:
+        '''Drop everything'''
+        self.entries.clear()
+        self.tags.clear()
+
+
+class RedisBackend:
+    '''Response cache backend speaking Redis protocol
+
+    Errors of the server are logged and treated as cache misses,
+    so an unavailable cache only costs database queries.
+    '''
+    def __init__(self, url: str, ttl: float, client=None):
+        # pylint: disable=import-outside-toplevel
+        from redis import asyncio as redis, RedisError
+
+        self.client = client or redis.from_url(url)
+        self.ttl = max(int(ttl), 1)
+        self.errors = (RedisError, OSError)
+
+    async def get(self, key: str) -> bytes | None:
+        '''Return cached body'''
+        try:
+            return await self.client.get(key)
+        except self.errors as exc:
+            logger.warning('Cache get failed: %s', exc)
+            return None
+
+    async def set(
+        self,
+        key: str,
+        value: bytes,
+        tags: Iterable[str] = ()
+    ) -> None:
+        '''Store body, tags group keys for invalidation together'''
+        try:
+            async with self.client.pipeline(transaction=False) as pipe:
+                pipe.set(key, value, ex=self.ttl)
+                for tag in tags:
+                    pipe.sadd(tag, key)
+                    pipe.expire(tag, self.ttl)
+                await pipe.execute()
+        except self.errors as exc:
+            logger.warning('Cache set failed: %s', exc)
+
+    async def delete(self, *keys: str) -> None:
+        '''Drop given keys'''
+        try:
+            await self.client.delete(*keys)
+        except self.errors as exc:
+            logger.warning('Cache delete failed: %s', exc)
+
+    async def invalidate_tag(self, tag: str) -> None:
+        '''Drop every key stored with the tag'''
+        try:
+            keys = await self.client.smembers(tag)
+            await self.client.delete(tag, *keys)
+        except self.errors as exc:
+            logger.warning('Cache invalidation failed: %s', exc)
+
+    async def clear(self) -> None:
+        '''Drop everything in the database'''
+        await self.client.flushdb()
+
+
+def create_response_cache() -> MemoryBackend | RedisBackend:
+    '''Build response cache backend selected in settings'''
+    if settings.CACHE_BACKEND == 'redis':
+        return RedisBackend(settings.CACHE_URL, settings.RESPONSE_CACHE_TTL)
+
+    return MemoryBackend(
+        maxsize=settings.RESPONSE_CACHE_SIZE,
+        ttl=settings.RESPONSE_CACHE_TTL
+    )
+
+
+manufacturer_ids = LRUCache(
+    maxsize=settings.MANUFACTURER_CACHE_SIZE,
+    ttl=settings.MANUFACTURER_CACHE_TTL
+)
+
+facet_cache = LRUCache(
+    maxsize=settings.FACET_CACHE_SIZE,
+    ttl=settings.FACET_CACHE_TTL
+)
+
+response_cache = create_response_cache()
+
+
+# repeated invalidations, also keeps them from being garbage collected
+repeats: set[asyncio.Task] = set()
+
+
+async def drop_responses(
+    keys: tuple[str, ...],
+    tags: tuple[str, ...]
+) -> None:
+    '''Drop cached responses by key and tag'''
+    if keys:
+        await response_cache.delete(*keys)
+    for tag in tags:
+        await response_cache.invalidate_tag(tag)
+
+
+async def drop_responses_later(
+    keys: tuple[str, ...],
+    tags: tuple[str, ...]
+) -> None:
+    '''Drop cached responses again once replicas caught up'''
+    await asyncio.sleep(
+        max(settings.READ_YOUR_WRITES_SECONDS, MIN_REPEAT_DELAY)
+    )
+    await drop_responses(keys, tags)
+
+
+async def invalidate_responses(
+    *keys: str,
+    tags: Iterable[str] = ()
+) -> None:
+    '''Drop cached responses after a write, and once more later
+
+    A read that started before the write, or ran on a replica behind it,
+    may store the old body right after the first drop. The second one,
+    READ_YOUR_WRITES_SECONDS later, bounds how long such a body is
+    served to the window in which replica reads are stale anyway.
+    '''
+    tags = tuple(tags)
+    await drop_responses(keys, tags)
+
+    task = asyncio.get_running_loop().create_task(
+        drop_responses_later(keys, tags)
+    )
+    repeats.add(task)
+    task.add_done_callback(repeats.discard)
@@ -1,36 +1,235 @@
 '''Database management module'''
+import itertools
+import logging
+import math
+import time
 from typing import Annotated, AsyncGenerator
-from fastapi import Depends
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, \
-                                    create_async_engine
+from fastapi import Depends, Request, Response
+from sqlalchemy import exc, make_url
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, \
+                                    async_sessionmaker, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from sqlmodel import SQLModel
 from .settings import settings
 
 
-async_engine = create_async_engine(
-    settings.database_url,
-    future=True
-)
+logger = logging.getLogger(__name__)
 
 
-async def init_db() -> None:
-    '''Create all database tables.'''
-    async with async_engine.begin() as conn:
-        await conn.run_sync(SQLModel.metadata.create_all)
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    '''Queue pool recording how long checkouts wait for a connection'''
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            self.timeouts += 1
+            raise
+        finally:
+            wait = time.perf_counter() - start
+            self.checkouts += 1
+            self.wait_total += wait
+            self.wait_max = max(self.wait_max, wait)
+
+    def stats(self) -> dict:
+        '''Connection counts and checkout wait times'''
+        return {
+            'size': self.size(),
+            'max_overflow': self._max_overflow,
+            'checked_out': self.checkedout(),
+            'idle': self.checkedin(),
+            'overflow': max(self.overflow(), 0),
+            'checkouts': self.checkouts,
+            'timeouts': self.timeouts,
+            'wait_avg_ms': round(
+                self.wait_total / self.checkouts * 1000, 3
+            ) if self.checkouts else 0.0,
+            'wait_max_ms': round(self.wait_max * 1000, 3)
+        }
+
+
+def engine_options(url: str, workers: int = 1) -> dict:
+    '''Pool and driver options for create_async_engine from settings
+
+    POOL_SIZE and MAX_OVERFLOW are totals for all worker processes, each
+    one gets its share so the server as a whole stays within them. A
+    worker keeps at least one connection, with more workers than
+    POOL_SIZE the total is exceeded and a warning is logged.
+    '''
+    if settings.POOL_SIZE < workers:
+        logger.warning(
+            'POOL_SIZE %d is less than %d workers, each keeps one '
+            'connection, %d in total',
+            settings.POOL_SIZE, workers, workers
+        )
+
+    options = {
+        'poolclass': InstrumentedPool,
+        'pool_size': max(settings.POOL_SIZE // workers, 1),
+        'max_overflow': settings.MAX_OVERFLOW // workers,
+        'pool_timeout': settings.POOL_TIMEOUT,
+        'pool_recycle': settings.POOL_RECYCLE,
+        'pool_pre_ping': settings.POOL_PRE_PING,
+    }
+
+    if make_url(url).get_driver_name() == 'asyncpg':
+        options['connect_args'] = {
+            'statement_cache_size': settings.STATEMENT_CACHE_SIZE,
+            'prepared_statement_cache_size':
+                settings.PREPARED_STATEMENT_CACHE_SIZE,
+        }
+
+    return options
+
 
+class ReplicaSet:
+    '''Read replica engines with a selection strategy'''
+    def __init__(self, engines: list[AsyncEngine], strategy: str):
+        self.engines = engines
+        self.strategy = strategy
+        self._counter = itertools.count()
+
+    def choose(self) -> AsyncEngine | None:
+        '''Next replica, round robin or the one with fewest checkouts
+
+        Ties of least busy are broken round robin as well.
+        '''
+        if not self.engines:
+            return None
+
+        start = next(self._counter) % len(self.engines)
+        rotated = self.engines[start:] + self.engines[:start]
+
+        if self.strategy == 'least_busy':
+            return min(
+                rotated,
+                key=lambda engine: getattr(engine.pool, 'checkedout', int)()
+            )
+
+        return rotated[0]
+
+
+def create_engine(url: str, workers: int = 1) -> AsyncEngine:
+    '''Async engine with pool configured from settings'''
+    return create_async_engine(
+        url, future=True, **engine_options(url, workers)
+    )
+
+
+# Engines are created by open_engines in each serving process, after
+# workers are forked, and disposed of by close_engines on shutdown.
+async_engine: AsyncEngine | None = None
+
+replicas = ReplicaSet([], settings.REPLICA_SELECTION)
 
 async_session = async_sessionmaker(
-    bind=async_engine,
     class_=AsyncSession,
     expire_on_commit=False,
     autoflush=False
 )
 
 
-async def get_async_session() -> AsyncGenerator[AsyncSession, None]:
-    '''FastAPI dependency that yields a database session per request'''
+def open_engines(workers: int | None = None) -> None:
+    '''Create primary and replica engines of this process'''
+    global async_engine  # pylint: disable=global-statement
+    workers = workers or settings.WORKERS
+
+    async_engine = create_engine(settings.database_url, workers)
+    replicas.engines = [
+        create_engine(url, workers) for url in settings.REPLICA_URLS
+    ]
+    async_session.configure(bind=async_engine)
+
+
+async def close_engines() -> None:
+    '''Close all pooled connections of this process'''
+    for engine in (async_engine, *replicas.engines):
+        if engine is not None:
+            await engine.dispose()
+
+
+async def init_db() -> None:
+    '''Create all database tables.'''
+    async with async_engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.create_all)
+
+
+def dialect_insert(session: AsyncSession, entity):
+    '''INSERT construct with ON CONFLICT support for the session dialect'''
+    if session.bind.dialect.name == 'postgresql':
+        return postgresql.insert(entity)
+    return sqlite.insert(entity)
+
+
+UNIQUE_VIOLATION_CODES = ('23505', 'SQLITE_CONSTRAINT_UNIQUE')
+
+
+def is_unique_violation(error: exc.IntegrityError) -> bool:
+    '''Whether integrity error comes from a unique constraint'''
+    return (
+        getattr(error.orig, 'pgcode', None)
+        or getattr(error.orig, 'sqlite_errorname', None)
+    ) in UNIQUE_VIOLATION_CODES
+
+
+READ_YOUR_WRITES_COOKIE = 'rw_until'
+
+
+async def get_async_session(
+    response: Response
+) -> AsyncGenerator[AsyncSession, None]:
+    '''FastAPI dependency that yields a primary database session
+
+    With READ_YOUR_WRITES_SECONDS set, marks the client so its reads
+    stay on the primary until replicas catch up.
+    '''
+    if settings.READ_YOUR_WRITES_SECONDS > 0:
+        response.set_cookie(
+            READ_YOUR_WRITES_COOKIE,
+            f'{time.time() + settings.READ_YOUR_WRITES_SECONDS:.3f}',
+            max_age=math.ceil(settings.READ_YOUR_WRITES_SECONDS),
+            httponly=True,
+            samesite='lax'
+        )
+
     async with async_session() as session:
         yield session
 
 
-SessionDep = Annotated[AsyncSession, Depends(get_async_session)]
+def wrote_recently(request: Request) -> bool:
+    '''Whether client is inside read-your-writes window'''
+    try:
+        return float(
+            request.cookies.get(READ_YOUR_WRITES_COOKIE, 0)
+        ) > time.time()
+    except ValueError:
+        return False
+
+
+async def get_read_session(
+    request: Request
+) -> AsyncGenerator[AsyncSession, None]:
+    '''FastAPI dependency that yields a read-only session on a replica
+
+    Falls back to the primary without replicas or right after the client
+    wrote something.
+    '''
+    engine = replicas.choose()
+
+    if engine is None or wrote_recently(request):
+        engine = async_engine
+
+    async with async_session(bind=engine) as session:
+        yield session
+
+
+WriteSessionDep = Annotated[AsyncSession, Depends(get_async_session)]
+ReadSessionDep = Annotated[AsyncSession, Depends(get_read_session)]
@@ -0,0 +1,76 @@
+'''Catalog export module'''
+import csv
+import io
+import json
+from typing import AsyncIterator
+from sqlalchemy import Select
+from sqlalchemy.ext.asyncio import AsyncSession
+from .models import CarPublic
+from .serialization import json_default
+
+
+NDJSON_MEDIA_TYPE = 'application/x-ndjson'
+CSV_MEDIA_TYPE = 'text/csv'
+EXPORT_MEDIA_TYPES = (NDJSON_MEDIA_TYPE, CSV_MEDIA_TYPE)
+EXPORT_CHUNK_SIZE = 1000
+
+CAR_EXPORT_FIELDS = tuple(CarPublic.model_fields)
+
+
+def negotiate_export(accept: str | None) -> str | None:
+    '''Pick export media type requested by Accept header'''
+    if not accept:
+        return None
+
+    requested = [part.split(';')[0].strip() for part in accept.split(',')]
+    for media_type in requested:
+        if media_type in EXPORT_MEDIA_TYPES:
+            return media_type
+
+    return None
+
+
+def ndjson_chunk(rows) -> str:
+    '''Render rows as newline delimited JSON'''
+    return ''.join(
+        json.dumps(
+            dict(zip(CAR_EXPORT_FIELDS, row)),
+            ensure_ascii=False,
+            separators=(',', ':'),
+            default=json_default
+        ) + '\n'
+        for row in rows
+    )
+
+
+def csv_chunk(rows, header: bool = False) -> str:
+    '''Render rows as CSV lines'''
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+    if header:
+        writer.writerow(CAR_EXPORT_FIELDS)
+    writer.writerows(rows)
+    return buffer.getvalue()
+
+
+async def stream_cars(
+    session: AsyncSession,
+    query: Select,
+    media_type: str
+) -> AsyncIterator[str]:
+    '''Stream rows of query through server side cursor in fixed chunks
+
+    Query must select columns in CAR_EXPORT_FIELDS order.
+    '''
+    result = await session.stream(
+        query.execution_options(yield_per=EXPORT_CHUNK_SIZE)
+    )
+
+    if media_type == CSV_MEDIA_TYPE:
+        yield csv_chunk([], header=True)
+
+    async for rows in result.partitions(EXPORT_CHUNK_SIZE):
+        if media_type == CSV_MEDIA_TYPE:
+            yield csv_chunk(rows)
+        else:
+            yield ndjson_chunk(rows)
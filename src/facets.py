@@ -0,0 +1,89 @@
+'''Car facets module'''
+from decimal import Decimal
+from sqlalchemy import ColumnElement, Select, case, func, literal, \
+                        select, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+from .models import Car, Manufacturer
+
+
+PRICE_BUCKETS = tuple(
+    Decimal(bound)
+    for bound in (0, 5000, 10000, 25000, 50000, 100000, 250000)
+)
+
+
+def price_bucket() -> ColumnElement:
+    '''Index of PRICE_BUCKETS bound the car price falls into'''
+    return case(
+        *(
+            (Car.price < bound, index)
+            for index, bound in enumerate(PRICE_BUCKETS[1:])
+        ),
+        else_=len(PRICE_BUCKETS) - 1
+    )
+
+
+def facet_query() -> Select:
+    '''Cars joined with manufacturers projected to faceted values'''
+    return select(
+        Car.color.label('color'),
+        Manufacturer.name.label('manufacturer'),
+        price_bucket().label('bucket')
+    ).join(Manufacturer)
+
+
+async def car_facets(session: AsyncSession, query: Select) -> dict:
+    '''Count cars of facet_query based query by each facet at once
+
+    PostgreSQL groups by GROUPING SETS, other dialects fall back to
+    UNION ALL of three groupings over the same CTE.
+    '''
+    cars = query.cte('faceted')
+    facets = (cars.c.color, cars.c.manufacturer, cars.c.bucket)
+
+    if session.bind.dialect.name == 'postgresql':
+        statement = select(*facets, func.count()).group_by(
+            func.grouping_sets(*facets)
+        )
+    else:
+        statement = union_all(*(
+            select(*(
+                facet if facet is grouped else literal(None).label(facet.key)
+                for facet in facets
+            ), func.count()).group_by(grouped)
+            for grouped in facets
+        ))
+
+    colors, manufacturers, buckets = {}, {}, {}
+
+    for color, manufacturer, bucket, count in await session.execute(statement):
+        if color is not None:
+            colors[color] = count
+        elif manufacturer is not None:
+            manufacturers[manufacturer] = count
+        elif bucket is not None:
+            buckets[bucket] = count
+
+    return {
+        'colors': facet_counts(colors),
+        'manufacturers': facet_counts(manufacturers),
+        'prices': [
+            {
+                'min_price': PRICE_BUCKETS[bucket],
+                'max_price': PRICE_BUCKETS[bucket + 1]
+                if bucket + 1 < len(PRICE_BUCKETS) else None,
+                'count': buckets[bucket]
+            }
+            for bucket in sorted(buckets)
+        ],
+    }
+
+
+def facet_counts(counts: dict[str, int]) -> list[dict]:
+    '''Facet values with counts, most frequent first'''
+    return [
+        {'value': value, 'count': count}
+        for value, count in sorted(
+            counts.items(), key=lambda item: (-item[1], item[0])
+        )
+    ]
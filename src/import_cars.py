@@ -0,0 +1,35 @@
+'''Command line CSV import of cars
+
+Usage: python -m src.import_cars cars.csv
+'''
+import argparse
+import asyncio
+import json
+from typing import AsyncIterator
+from .database import async_session, close_engines, open_engines
+from .importer import import_cars_csv
+
+
+async def read_lines(path: str) -> AsyncIterator[str]:
+    '''Yield lines of a file'''
+    with open(path, encoding='utf-8-sig', newline='') as file:
+        for line in file:
+            yield line
+
+
+async def main(path: str) -> None:
+    '''Import cars from CSV file and print the summary'''
+    open_engines(workers=1)
+    async with async_session() as session:
+        result = await import_cars_csv(session, read_lines(path))
+    await close_engines()
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        'path',
+        help='CSV file with name,color,price,manufacturer_name columns'
+    )
+    asyncio.run(main(parser.parse_args().path))
@@ -0,0 +1,218 @@
+'''Bulk CSV import module'''
+import csv
+import re
+from decimal import Decimal, InvalidOperation
+from typing import AsyncIterable, AsyncIterator
+from sqlalchemy import Column, MetaData, Numeric, String, Table, \
+                        insert, select, true
+from sqlalchemy.ext.asyncio import AsyncSession
+from .database import dialect_insert
+from .models import Car, Manufacturer
+from .queries import normalize_name
+from .schemas import NAME_WITH_DIGITS, NAME_WITHOUT_DIGITS
+from .versioning import CARS, MANUFACTURERS, bump_catalog_versions
+
+
+IMPORT_BATCH_SIZE = 10000
+MAX_REPORTED_ERRORS = 100
+IMPORT_COLUMNS = ('name', 'color', 'price', 'manufacturer_name')
+MAX_PRICE = Decimal(10) ** 9
+
+NAME_RE = re.compile(NAME_WITH_DIGITS)
+NAME_WITHOUT_DIGITS_RE = re.compile(NAME_WITHOUT_DIGITS)
+
+staging_metadata = MetaData()
+
+cars_staging = Table(
+    'cars_staging',
+    staging_metadata,
+    Column('name', String(50), nullable=False),
+    Column('color', String(50), nullable=False),
+    Column('price', Numeric(11, 2), nullable=False),
+    Column('manufacturer_name', String(50), nullable=False),
+    prefixes=['TEMPORARY'],
+)
+
+
+class CsvImportError(ValueError):
+    '''Row of imported CSV that can not be loaded'''
+
+
+def parse_row(
+    row: list[str],
+    order: list[int]
+) -> tuple[str, str, Decimal, str]:
+    '''Validate CSV row with the same rules as CarCreate
+
+    Names are normalized here, SQL lower() of SQLite only folds ASCII.
+    '''
+    if len(row) != len(order):
+        raise CsvImportError(f'expected {len(order)} columns')
+
+    name, color, price, manufacturer_name = (
+        row[index].strip() for index in order
+    )
+
+    for field, value, pattern in (
+        ('name', name, NAME_RE),
+        ('color', color, NAME_WITHOUT_DIGITS_RE),
+        ('manufacturer_name', manufacturer_name, NAME_WITHOUT_DIGITS_RE),
+    ):
+        if len(value) > 50 or not pattern.match(value):
+            raise CsvImportError(f'invalid {field}')
+
+    try:
+        parsed_price = Decimal(price)
+    except InvalidOperation as exc:
+        raise CsvImportError('invalid price') from exc
+
+    if not (
+        parsed_price.is_finite()
+        and 0 <= parsed_price < MAX_PRICE
+        and parsed_price.as_tuple().exponent >= -2
+    ):
+        raise CsvImportError('invalid price')
+
+    return (
+        normalize_name(name),
+        normalize_name(color),
+        parsed_price,
+        normalize_name(manufacturer_name)
+    )
+
+
+async def iter_lines(chunks: AsyncIterable[bytes]) -> AsyncIterator[str]:
+    '''Split stream of byte chunks into text lines'''
+    tail = b''
+    async for chunk in chunks:
+        lines = (tail + chunk).split(b'\n')
+        tail = lines.pop()
+        for line in lines:
+            yield line.decode('utf-8-sig')
+    if tail:
+        yield tail.decode('utf-8-sig')
+
+
+async def aenumerate(
+    items: AsyncIterable[str],
+    start: int = 0
+) -> AsyncIterator[tuple[int, str]]:
+    '''Asynchronous counterpart of enumerate'''
+    index = start
+    async for item in items:
+        yield index, item
+        index += 1
+
+
+async def copy_to_staging(
+    session: AsyncSession,
+    records: list[tuple]
+) -> None:
+    '''Load records into staging table, through COPY on asyncpg'''
+    connection = await session.connection()
+
+    if connection.dialect.driver == 'asyncpg':
+        raw_connection = await connection.get_raw_connection()
+        await raw_connection.driver_connection.copy_records_to_table(
+            cars_staging.name,
+            records=records,
+            columns=IMPORT_COLUMNS
+        )
+    else:
+        await session.execute(
+            insert(cars_staging),
+            [dict(zip(IMPORT_COLUMNS, record)) for record in records]
+        )
+
+
+async def merge_staging(session: AsyncSession) -> int:
+    '''Move staged rows into manufacturers and cars with set-based SQL
+
+    Staged names are already normalized by parse_row.
+    '''
+    manufacturer_name = cars_staging.c.manufacturer_name
+
+    await session.execute(
+        dialect_insert(session, Manufacturer)
+        .from_select(
+            ['name'],
+            select(manufacturer_name).distinct().where(true())
+        )
+        .on_conflict_do_nothing(index_elements=[Manufacturer.name])
+    )
+
+    result = await session.execute(
+        insert(Car).from_select(
+            ['name', 'color', 'price', 'manufacturer_id'],
+            select(
+                cars_staging.c.name,
+                cars_staging.c.color,
+                cars_staging.c.price,
+                Manufacturer.id
+            ).join(Manufacturer, Manufacturer.name == manufacturer_name)
+        )
+    )
+
+    return result.rowcount
+
+
+async def import_cars_csv(
+    session: AsyncSession,
+    lines: AsyncIterable[str]
+) -> dict:
+    '''Import cars from CSV lines with name,color,price,manufacturer_name
+
+    Rows are validated and copied into a temporary staging table in
+    batches, then merged at once. Everything runs in one transaction,
+    invalid rows are skipped and reported by line number.
+    '''
+    connection = await session.connection()
+    await connection.run_sync(cars_staging.drop, checkfirst=True)
+    await connection.run_sync(cars_staging.create)
+
+    rows = rejected = 0
+    errors = []
+    batch = []
+    order = None
+
+    async for line_number, line in aenumerate(lines, start=1):
+        if not line.strip():
+            continue
+
+        row = next(csv.reader([line]))
+
+        if order is None:
+            header = [column.strip().lower() for column in row]
+            if sorted(header) != sorted(IMPORT_COLUMNS):
+                raise CsvImportError(
+                    f'CSV header must be {",".join(IMPORT_COLUMNS)}'
+                )
+            order = [header.index(column) for column in IMPORT_COLUMNS]
+            continue
+
+        rows += 1
+        try:
+            batch.append(parse_row(row, order))
+        except CsvImportError as exc:
+            rejected += 1
+            if len(errors) < MAX_REPORTED_ERRORS:
+                errors.append(f'line {line_number}: {exc}')
+
+        if len(batch) >= IMPORT_BATCH_SIZE:
+            await copy_to_staging(session, batch)
+            batch = []
+
+    if batch:
+        await copy_to_staging(session, batch)
+
+    created = await merge_staging(session)
+    await connection.run_sync(cars_staging.drop)
+    await bump_catalog_versions(session, CARS, MANUFACTURERS)
+    await session.commit()
+
+    return {
+        'rows': rows,
+        'created': created,
+        'rejected': rejected,
+        'errors': errors
+    }
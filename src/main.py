@@ -1,11 +1,39 @@
 "Main module"
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from .database import close_engines, open_engines
+from .metrics import MetricsMiddleware
+from .openapi import prebuilt_openapi
 from .routers.cars import cars_router
+from .routers.health import health_router
 from .routers.manufacturers import manufacturer_router
+from .settings import settings
+
+
+@asynccontextmanager
+async def lifespan(application: FastAPI):
+    '''Create database engines in the serving process, dispose on exit
+
+    Warm-up finishes before startup completes, and uvicorn starts
+    accepting connections in a worker only after that, so no worker
+    serves traffic on a cold pool.
+    '''
+    open_engines()
+    application.state.ready = not settings.WARMUP
+
+    if settings.WARMUP:
+        # pylint: disable=import-outside-toplevel
+        from .warmup import warm_up
+        await warm_up(application)
+
+    yield
+
+    await close_engines()
 
 
 app = FastAPI(
-    debug=True,
+    lifespan=lifespan,
+    debug=settings.DEBUG,
     title='Cars',
     description='REST API for managing cars and manufacturers',
     version='0.1.0',
@@ -14,6 +42,29 @@ app = FastAPI(
 
 app.include_router(cars_router)
 app.include_router(manufacturer_router)
+app.include_router(health_router)
+
+# per-request statement counts also feed the headers and the N+1 check
+if settings.METRICS or settings.DB_QUERY_HEADERS or \
+        settings.N_PLUS_ONE_THRESHOLD:
+    app.add_middleware(MetricsMiddleware)
+
+# Optional parts are imported only when enabled to keep startup short
+if settings.METRICS:
+    from .routers.metrics import metrics_router
+    app.include_router(metrics_router)
+
+# pool and cache counters, kept apart from DEBUG to stay on in production
+if settings.POOL_DEBUG:
+    from .routers.debug import debug_router
+    app.include_router(debug_router)
+
+if settings.SLOW_QUERY_MS > 0:
+    from .slow_queries import configure_slow_query_log
+    configure_slow_query_log(settings.SLOW_QUERY_LOG)
+
+if settings.OPENAPI_FILE:
+    app.openapi = prebuilt_openapi(app, settings.OPENAPI_FILE)
 
 
 @app.get('/')
@@ -0,0 +1,281 @@
+'''Request and database metrics module
+
+A pure ASGI middleware times every request and labels it with the route
+template, so /cars/1 and /cars/2 share series. Cursor events of all
+engines add statement time to the request being served, found through a
+context variable. Series live in process memory and are rendered in
+Prometheus text format.
+
+The same per-request counts are optionally returned in X-DB-Queries and
+X-DB-Time-ms headers, and statements repeated within one request, the
+N+1 pattern, are logged.
+'''
+import bisect
+import logging
+import time
+from collections import Counter as StatementCounter
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from .settings import settings
+
+
+logger = logging.getLogger(__name__)
+
+
+LATENCY_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10
+)
+
+UNMATCHED_ROUTE = 'unmatched'
+
+
+@dataclass
+class RequestMetrics:
+    '''Database work done while serving one request'''
+    scope: dict = field(default_factory=dict)
+    statements: int = 0
+    db_time: float = 0.0
+    repeated: StatementCounter = field(default_factory=StatementCounter)
+
+
+current_request: ContextVar[RequestMetrics | None] = ContextVar(
+    'current_request', default=None
+)
+
+
+def escape(value: str) -> str:
+    '''Label value escaped for the text format'''
+    return value.replace('\\', '\\\\').replace('"', '\\"') \
+        .replace('\n', '\\n')
+
+
+def format_labels(names: tuple[str, ...], values: tuple) -> str:
+    '''Label set like {method="GET",route="/cars"}'''
+    return '{' + ','.join(
+        f'{name}="{escape(str(value))}"'
+        for name, value in zip(names, values)
+    ) + '}'
+
+
+class Counter:
+    '''Monotonic counter per label values'''
+    kind = 'counter'
+
+    def __init__(self, name: str, documentation: str, labels: tuple[str, ...]):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.values: dict[tuple, float] = {}
+
+    def inc(self, labels: tuple, amount: float = 1) -> None:
+        '''Add amount to the series of label values'''
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def samples(self) -> list[str]:
+        '''Lines of all series'''
+        return [
+            f'{self.name}{format_labels(self.labels, labels)} {value}'
+            for labels, value in sorted(self.values.items())
+        ]
+
+
+class Histogram:
+    '''Cumulative bucket histogram per label values'''
+    kind = 'histogram'
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: tuple[str, ...],
+        buckets: tuple[float, ...] = LATENCY_BUCKETS
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.buckets = buckets
+        # per label values: counts per bucket and +Inf, then sum
+        self.values: dict[tuple, tuple[list[int], list[float]]] = {}
+
+    def observe(self, labels: tuple, value: float) -> None:
+        '''Record value in the series of label values'''
+        series = self.values.get(labels)
+        if series is None:
+            series = self.values[labels] = (
+                [0] * (len(self.buckets) + 1), [0.0]
+            )
+
+        series[0][bisect.bisect_left(self.buckets, value)] += 1
+        series[1][0] += value
+
+    def samples(self) -> list[str]:
+        '''Lines of all series, buckets made cumulative'''
+        lines = []
+        names = self.labels + ('le',)
+
+        for labels, (counts, total) in sorted(self.values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += count
+                lines.append(
+                    f'{self.name}_bucket'
+                    f'{format_labels(names, labels + (bound,))} {cumulative}'
+                )
+            label_set = format_labels(self.labels, labels)
+            lines.append(f'{self.name}_sum{label_set} {total[0]}')
+            lines.append(f'{self.name}_count{label_set} {cumulative}')
+
+        return lines
+
+
+class Registry:
+    '''Metrics rendered together'''
+    def __init__(self):
+        self.metrics: list[Counter | Histogram] = []
+
+    def register(self, metric: Counter | Histogram) -> Counter | Histogram:
+        '''Add metric and return it'''
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        '''Prometheus text exposition of all metrics'''
+        lines = []
+        for metric in self.metrics:
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            lines.extend(metric.samples())
+        return '\n'.join(lines) + '\n'
+
+    def clear(self) -> None:
+        '''Drop all series'''
+        for metric in self.metrics:
+            metric.values.clear()
+
+
+registry = Registry()
+
+request_duration = registry.register(Histogram(
+    'http_request_duration_seconds',
+    'Time to serve requests, count is the number of requests',
+    ('method', 'route', 'status')
+))
+
+request_db_duration = registry.register(Histogram(
+    'http_request_db_duration_seconds',
+    'Time spent executing database statements per request',
+    ('method', 'route')
+))
+
+request_db_statements = registry.register(Counter(
+    'http_request_db_statements_total',
+    'Database statements executed while serving requests',
+    ('method', 'route')
+))
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def before_cursor_execute(
+    conn, cursor, statement, parameters, context, executemany
+):
+    '''Remember statement start when serving a request'''
+    # pylint: disable=unused-argument,too-many-arguments
+    if current_request.get() is not None:
+        conn.info.setdefault('statement_start', []).append(
+            time.perf_counter()
+        )
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def after_cursor_execute(
+    conn, cursor, statement, parameters, context, executemany
+):
+    '''Add statement time to the request being served'''
+    # pylint: disable=unused-argument,too-many-arguments
+    metrics = current_request.get()
+    starts = conn.info.get('statement_start')
+
+    if metrics is not None and starts:
+        metrics.statements += 1
+        metrics.db_time += time.perf_counter() - starts.pop()
+        if settings.N_PLUS_ONE_THRESHOLD:
+            metrics.repeated[statement] += 1
+
+
+@event.listens_for(Engine, 'handle_error')
+def handle_error(exception_context):
+    '''Forget start of statement that failed'''
+    conn = exception_context.connection
+    if conn is not None and \
+            exception_context.execution_context is not None:
+        starts = conn.info.get('statement_start')
+        if starts:
+            starts.pop()
+
+
+def route_template(scope: dict) -> str:
+    '''Path template of the matched route'''
+    route = scope.get('route')
+    return getattr(route, 'path', UNMATCHED_ROUTE)
+
+
+def query_headers(metrics: RequestMetrics) -> list[tuple[bytes, bytes]]:
+    '''Statement count and database time response headers'''
+    return [
+        (b'x-db-queries', str(metrics.statements).encode()),
+        (b'x-db-time-ms', f'{metrics.db_time * 1000:.3f}'.encode()),
+    ]
+
+
+def warn_repeated(method: str, route: str, metrics: RequestMetrics) -> None:
+    '''Log statements executed more often than the N+1 threshold'''
+    for statement, count in metrics.repeated.items():
+        if count > settings.N_PLUS_ONE_THRESHOLD:
+            logger.warning(
+                'Statement executed %d times serving %s %s: %s',
+                count, method, route, statement
+            )
+
+
+class MetricsMiddleware:
+    '''Record latency, status and database work of HTTP requests'''
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        metrics = RequestMetrics(scope=scope)
+        token = current_request.set(metrics)
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message['type'] == 'http.response.start':
+                status_code = message['status']
+                if settings.DB_QUERY_HEADERS:
+                    message = {**message, 'headers': [
+                        *message.get('headers', ()), *query_headers(metrics)
+                    ]}
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - start
+            current_request.reset(token)
+            labels = (scope['method'], route_template(scope))
+
+            if settings.METRICS:
+                request_duration.observe(labels + (status_code,), elapsed)
+                request_db_duration.observe(labels, metrics.db_time)
+                if metrics.statements:
+                    request_db_statements.inc(labels, metrics.statements)
+
+            if metrics.repeated:
+                warn_repeated(*labels, metrics)
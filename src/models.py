@@ -1,8 +1,9 @@
 '''Models module'''
 from decimal import Decimal
-from sqlmodel import SQLModel, CheckConstraint, Field, Relationship, \
-                        UniqueConstraint
-from sqlalchemy import event
+from pydantic import field_validator
+from sqlmodel import SQLModel, CheckConstraint, Field, Index, \
+                        Relationship, UniqueConstraint
+from sqlalchemy import DDL, event
 from .schemas import CAR_NAME_SCHEMA, CAR_COLOR_SCHEMA, \
                         MANUFACTURER_NAME_SCHEMA
 
@@ -25,6 +26,11 @@ class Manufacturer(ManufacturerBase, table=True):
 
     __table_args__ = (
         UniqueConstraint('name', name='check_manufacturer_unique_name'),
+        Index(
+            'ix_manufacturers_name_trgm', 'name',
+            postgresql_using='gin',
+            postgresql_ops={'name': 'gin_trgm_ops'}
+        ).ddl_if(dialect='postgresql'),
     )
 
 
@@ -33,10 +39,23 @@ class ManufacturerPublic(ManufacturerBase):
     id: int
 
 
+class ManufacturerPage(SQLModel):
+    '''Page of manufacturers with cursor for the next one'''
+    items: list[ManufacturerPublic]
+    next_cursor: str | None = None
+
+
 class ManufacturerCreate(ManufacturerBase):
     '''Class for Manufacturer creation'''
 
 
+def reject_null(value):
+    '''Field of an update may be left out, but not set to null'''
+    if value is None:
+        raise ValueError('can not be null')
+    return value
+
+
 class ManufacturerUpdate(SQLModel):
     '''Class for uupdate Manufacturer'''
     name: str | None = Field(
@@ -44,16 +63,16 @@ class ManufacturerUpdate(SQLModel):
         schema_extra=MANUFACTURER_NAME_SCHEMA
     )
 
+    _name_not_null = field_validator('name')(reject_null)
+
 
 class CarBase(SQLModel):
     '''Base class for Car'''
     name: str = Field(
-        index=True,
         max_length=50,
         schema_extra=CAR_NAME_SCHEMA
     )
     color: str = Field(
-        index=True,
         max_length=50,
         schema_extra=CAR_COLOR_SCHEMA
     )
@@ -80,6 +99,18 @@ class Car(CarBase, table=True):
 
     __table_args__ = (
         CheckConstraint('price >= 0', name='check_price_positive'),
+        Index('ix_cars_price_id', 'price', 'id'),
+        Index('ix_cars_name_id', 'name', 'id'),
+        Index('ix_cars_color_price_id', 'color', 'price', 'id'),
+        Index(
+            'ix_cars_manufacturer_id_price_id',
+            'manufacturer_id', 'price', 'id'
+        ),
+        Index(
+            'ix_cars_name_trgm', 'name',
+            postgresql_using='gin',
+            postgresql_ops={'name': 'gin_trgm_ops'}
+        ).ddl_if(dialect='postgresql'),
     )
 
 
@@ -90,6 +121,12 @@ class CarPublic(CarBase):
     manufacturer_name: str
 
 
+class CarPage(SQLModel):
+    '''Page of cars with cursor for the next one'''
+    items: list[CarPublic]
+    next_cursor: str | None = None
+
+
 class CarCreate(CarBase):
     '''Class for Car creation'''
     manufacturer_name: str = Field(
@@ -98,6 +135,48 @@ class CarCreate(CarBase):
     )
 
 
+class CarBulkItem(SQLModel):
+    '''Outcome of single item of bulk Car creation'''
+    index: int
+    car: CarPublic | None = None
+    errors: list[str] = []
+
+
+class CarBulkResult(SQLModel):
+    '''Result of bulk Car creation'''
+    created: int
+    failed: int
+    items: list[CarBulkItem]
+
+
+class CarImportResult(SQLModel):
+    '''Result of Car import from CSV'''
+    rows: int
+    created: int
+    rejected: int
+    errors: list[str]
+
+
+class FacetCount(SQLModel):
+    '''Number of cars with given value of a facet'''
+    value: str
+    count: int
+
+
+class PriceFacetCount(SQLModel):
+    '''Number of cars in a price bucket, max_price is exclusive'''
+    min_price: Decimal
+    max_price: Decimal | None
+    count: int
+
+
+class CarFacets(SQLModel):
+    '''Counts of filtered cars by color, manufacturer and price bucket'''
+    colors: list[FacetCount]
+    manufacturers: list[FacetCount]
+    prices: list[PriceFacetCount]
+
+
 class CarUpdate(SQLModel):
     '''Class for Car update'''
     name: str | None = Field(
@@ -119,6 +198,74 @@ class CarUpdate(SQLModel):
         schema_extra=MANUFACTURER_NAME_SCHEMA
     )
 
+    _not_null = field_validator(
+        'name', 'color', 'price', 'manufacturer_name'
+    )(reject_null)
+
+
+class CatalogVersion(SQLModel, table=True):
+    '''Change counter of a catalog table, bumped by every write to it'''
+    __tablename__ = 'catalog_versions'
+
+    name: str = Field(primary_key=True, max_length=50)
+    version: int = Field(default=0)
+
+
+class CarPriceStats(SQLModel, table=True):
+    '''Running price totals of cars per manufacturer and color
+
+    Maintained by triggers on cars, see the stats module.
+    '''
+    __tablename__ = 'car_price_stats'
+
+    manufacturer_id: int = Field(primary_key=True)
+    color: str = Field(primary_key=True, max_length=50)
+    cars: int = Field(default=0)
+    price_total: Decimal = Field(default=0, max_digits=20, decimal_places=2)
+    price_min: Decimal = Field(max_digits=11, decimal_places=2)
+    price_max: Decimal = Field(max_digits=11, decimal_places=2)
+
+
+class PriceStats(SQLModel):
+    '''Count and price range of a group of cars'''
+    cars: int
+    min_price: Decimal
+    avg_price: Decimal
+    max_price: Decimal
+
+
+class ColorPriceStats(PriceStats):
+    '''Price statistics of cars of one color'''
+    color: str
+
+
+class ManufacturerPriceStats(PriceStats):
+    '''Price statistics of cars of one manufacturer'''
+    manufacturer_id: int
+    manufacturer_name: str
+
+
+class CarStats(SQLModel):
+    '''Price statistics of all cars by manufacturer and by color'''
+    by_manufacturer: list[ManufacturerPriceStats]
+    by_color: list[ColorPriceStats]
+
+
+class ManufacturerStats(SQLModel):
+    '''Price statistics of cars of manufacturer, overall and by color'''
+    manufacturer_id: int
+    total: PriceStats | None
+    by_color: list[ColorPriceStats]
+
+
+event.listen(
+    SQLModel.metadata,
+    'before_create',
+    DDL('CREATE EXTENSION IF NOT EXISTS pg_trgm').execute_if(
+        dialect='postgresql'
+    )
+)
+
 
 @event.listens_for(Manufacturer, 'before_insert')
 @event.listens_for(Manufacturer, 'before_update')
@@ -0,0 +1,92 @@
+'''Keyset pagination module'''
+import base64
+import binascii
+import json
+from decimal import Decimal
+from typing import Any, Callable, Sequence
+from fastapi import HTTPException, status
+from sqlalchemy import Select, TypeDecorator, literal, tuple_
+
+
+DEFAULT_PAGE_LIMIT = 100
+MAX_PAGE_LIMIT = 1000
+
+
+def encode_cursor(sort: str, values: Sequence[Any]) -> str:
+    '''Pack sort key of the last row into an opaque cursor'''
+    payload = json.dumps(
+        [sort, [str(v) if isinstance(v, Decimal) else v for v in values]],
+        separators=(',', ':')
+    )
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def python_type(column: Any) -> type:
+    '''Python type of column values, looking through type decorators'''
+    column_type = column.type
+    if isinstance(column_type, TypeDecorator):
+        column_type = column_type.impl_instance
+    return column_type.python_type
+
+
+def decode_cursor(
+    cursor: str,
+    sort: str,
+    columns: Sequence[Any]
+) -> list[Any]:
+    '''Unpack cursor into sort key values typed after columns'''
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        cursor_sort, values = json.loads(base64.urlsafe_b64decode(padded))
+        if cursor_sort != sort or len(values) != len(columns):
+            raise ValueError(cursor)
+        return [
+            python_type(column)(value)
+            for column, value in zip(columns, values)
+        ]
+    except (ValueError, TypeError, ArithmeticError, binascii.Error) as exc:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail='Invalid cursor'
+        ) from exc
+
+
+def paginate(
+    query: Select,
+    sort: str,
+    columns: Sequence[Any],
+    descending: bool,
+    cursor: str | None,
+    limit: int
+) -> Select:
+    '''Order query by sort key and seek past the cursor
+
+    Last column of the key must be unique, so every row has a distinct
+    position. One extra row is fetched to tell whether a next page exists.
+    '''
+    if cursor is not None:
+        values = decode_cursor(cursor, sort, columns)
+        key = tuple_(*columns)
+        bound = tuple_(*(
+            literal(value, column.type)
+            for column, value in zip(columns, values)
+        ))
+        query = query.where(key < bound if descending else key > bound)
+
+    return query.order_by(
+        *(column.desc() if descending else column.asc() for column in columns)
+    ).limit(limit + 1)
+
+
+def next_cursor(
+    rows: list[Any],
+    sort: str,
+    limit: int,
+    key: Callable[[Any], Sequence[Any]]
+) -> str | None:
+    '''Trim the extra row and return cursor for the next page if any'''
+    if len(rows) <= limit:
+        return None
+
+    del rows[limit:]
+    return encode_cursor(sort, key(rows[-1]))
@@ -0,0 +1,217 @@
+'''Shared queries module'''
+from typing import Iterable
+from sqlalchemy import ColumnElement, Insert, Row, Select, String, func, \
+                        insert, literal, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from .database import dialect_insert
+from .models import Car, CarCreate, Manufacturer
+from .versioning import CARS, MANUFACTURERS, execute_and_bump
+
+
+DEFAULT_SEARCH_LIMIT = 20
+MAX_SEARCH_LIMIT = 100
+# rows of a multi-row car INSERT, four parameters each stay under
+# SQLite's limit of 32766 bound variables
+SQLITE_INSERT_BATCH = 8000
+
+
+def normalize_name(value: str) -> str:
+    '''Normalize names the same way model events do'''
+    return value.lower().strip()
+
+
+def normalize_fields(data: dict, keys: Iterable[str]) -> dict:
+    '''Copy of data with string values of keys normalized'''
+    return {
+        key: normalize_name(value)
+        if key in keys and isinstance(value, str) else value
+        for key, value in data.items()
+    }
+
+
+def manufacturers_upsert(session: AsyncSession, names: list[str]) -> Insert:
+    '''Statement resolving or creating manufacturers, usable as a CTE
+
+    ON CONFLICT DO UPDATE is a no-op rewrite of the name, used instead of
+    DO NOTHING because only it returns rows that already existed, including
+    ones committed concurrently after the statement started.
+    '''
+    statement = dialect_insert(session, Manufacturer).values(
+        [{'name': name} for name in names]
+    )
+    return statement.on_conflict_do_update(
+        index_elements=[Manufacturer.name],
+        set_={'name': statement.excluded.name}
+    ).returning(Manufacturer.name, Manufacturer.id)
+
+
+async def upsert_manufacturers(
+    session: AsyncSession,
+    names: Iterable[str]
+) -> dict[str, int]:
+    '''Resolve or create manufacturers by name in one round trip
+
+    Names are sorted so concurrent upserts lock rows in the same order.
+    '''
+    names = sorted({normalize_name(name) for name in names})
+    if not names:
+        return {}
+
+    result = await session.execute(manufacturers_upsert(session, names))
+    return dict(result.all())
+
+
+async def manufacturer_id_expression(
+    session: AsyncSession,
+    name: str,
+    manufacturer_id: int | None
+) -> ColumnElement:
+    '''SQL expression of manufacturer id, creating it if id is unknown
+
+    On PostgreSQL the upsert becomes a CTE of the statement using the
+    expression, other dialects run it right away. A known id, usually
+    from a cache other workers do not invalidate, is only used while it
+    still has the name. Otherwise the expression is NULL and the statement
+    fails the NOT NULL constraint of cars.manufacturer_id, so the caller
+    can retry without the id.
+    '''
+    if manufacturer_id is not None:
+        return select(Manufacturer.id).where(
+            Manufacturer.id == manufacturer_id,
+            Manufacturer.name == name
+        ).scalar_subquery()
+
+    if session.bind.dialect.name == 'postgresql':
+        manufacturer = manufacturers_upsert(session, [name]) \
+            .cte('manufacturer')
+        return select(manufacturer.c.id).scalar_subquery()
+
+    manufacturer_id = (await upsert_manufacturers(session, [name]))[name]
+
+    return literal(manufacturer_id, Manufacturer.id.type)
+
+
+async def insert_car(
+    session: AsyncSession,
+    new_car: CarCreate,
+    manufacturer_id: int | None = None
+) -> Row:
+    '''Insert car, creating its manufacturer unless id is known
+
+    Returns row shaped like CarPublic. On PostgreSQL the manufacturer
+    upsert, the car insert and the catalog version bump are one statement.
+    '''
+    manufacturer_name = normalize_name(new_car.manufacturer_name)
+    changed_tables = [CARS] if manufacturer_id else [CARS, MANUFACTURERS]
+    cars = Car.__table__
+
+    statement = insert(cars).from_select(
+        ['name', 'color', 'price', 'manufacturer_id'],
+        select(
+            literal(normalize_name(new_car.name), String),
+            literal(normalize_name(new_car.color), String),
+            literal(new_car.price, cars.c.price.type),
+            await manufacturer_id_expression(
+                session, manufacturer_name, manufacturer_id
+            )
+        )
+    ).returning(
+        cars.c.name, cars.c.color, cars.c.price,
+        cars.c.id, cars.c.manufacturer_id,
+        literal(manufacturer_name, String).label('manufacturer_name')
+    )
+
+    return await execute_and_bump(session, statement, *changed_tables)
+
+
+async def insert_cars(session: AsyncSession, rows: list[dict]) -> list[int]:
+    '''Insert cars, returning their ids in the order of rows
+
+    PostgreSQL batches executemany with ordered RETURNING by itself, on
+    SQLite that falls back to a statement per row. There each batch is one
+    multi-row INSERT instead, its rowids are assigned in VALUES order so
+    sorted returned ids line up with rows.
+    '''
+    if session.bind.dialect.name == 'postgresql':
+        result = await session.execute(
+            insert(Car).returning(Car.id, sort_by_parameter_order=True),
+            rows
+        )
+        return list(result.scalars())
+
+    car_ids = []
+    for start in range(0, len(rows), SQLITE_INSERT_BATCH):
+        result = await session.execute(
+            insert(Car)
+            .values(rows[start:start + SQLITE_INSERT_BATCH])
+            .returning(Car.id)
+        )
+        car_ids += sorted(result.scalars())
+
+    return car_ids
+
+
+async def update_car_returning(
+    session: AsyncSession,
+    car_id: int,
+    update_data: dict,
+    manufacturer_name: str | None = None,
+    manufacturer_id: int | None = None
+) -> Row | None:
+    '''Update car in one UPDATE ... RETURNING, None if it does not exist
+
+    Returns row shaped like CarPublic. A new manufacturer_name is resolved
+    the same way as on insert, otherwise the current name is returned by
+    a subquery of RETURNING.
+    '''
+    cars = Car.__table__
+    changed_tables = [CARS]
+    values = normalize_fields(update_data, ('name', 'color'))
+
+    if manufacturer_name is not None:
+        if manufacturer_id is None:
+            changed_tables.append(MANUFACTURERS)
+        values['manufacturer_id'] = await manufacturer_id_expression(
+            session, manufacturer_name, manufacturer_id
+        )
+        returned_name = literal(manufacturer_name, String)
+    else:
+        returned_name = select(Manufacturer.name).where(
+            Manufacturer.id == cars.c.manufacturer_id
+        ).scalar_subquery()
+
+    statement = update(cars).where(cars.c.id == car_id).values(
+        values or {'id': cars.c.id}
+    ).returning(
+        cars.c.name, cars.c.color, cars.c.price,
+        cars.c.id, cars.c.manufacturer_id,
+        returned_name.label('manufacturer_name')
+    )
+
+    return await execute_and_bump(session, statement, *changed_tables)
+
+
+def fuzzy_search(
+    session: AsyncSession,
+    query: Select,
+    column: ColumnElement,
+    text: str
+) -> Select:
+    '''Narrow query to typo tolerant or prefix matches of column, best first
+
+    PostgreSQL uses pg_trgm similarity backed by GIN trigram indexes,
+    other dialects fall back to substring match ranked by prefix and length.
+    Prefix pattern is bound whole, so the index serves it in generic plans.
+    '''
+    text = normalize_name(text)
+    pattern = text.replace('/', '//').replace('%', '/%').replace('_', '/_')
+    prefix = column.like(f'{pattern}%', escape='/')
+
+    if session.bind.dialect.name == 'postgresql':
+        return query.where(
+            or_(column.op('%')(text), prefix)
+        ).order_by(func.similarity(column, text).desc(), column)
+
+    return query.where(
+        column.like(f'%{pattern}%', escape='/')
+    ).order_by(prefix.desc(), func.length(column), column)
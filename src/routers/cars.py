@@ -1,14 +1,147 @@
 '''Cars router'''
-from typing import Annotated
-from fastapi import APIRouter, HTTPException, status, Query
-from sqlalchemy import select
-from ..database import SessionDep
-from ..models import Car, CarPublic, CarCreate, CarUpdate, Manufacturer
+from decimal import Decimal
+from typing import Annotated, Any, Literal
+from fastapi import APIRouter, HTTPException, status, Body, Header, \
+                    Query, Request, Response
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from sqlalchemy import Select, delete, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..cache import car_key, facet_cache, invalidate_responses, \
+                    manufacturer_cars_tag, manufacturer_ids, response_cache
+from ..database import ReadSessionDep, WriteSessionDep
+from ..export import EXPORT_MEDIA_TYPES, negotiate_export, stream_cars
+from ..facets import car_facets, facet_query
+from ..importer import CsvImportError, import_cars_csv, iter_lines
+from ..models import Car, CarBulkItem, CarBulkResult, CarImportResult, \
+                        CarFacets, CarPage, CarPublic, CarCreate, \
+                        CarStats, CarUpdate, Manufacturer
+from ..pagination import DEFAULT_PAGE_LIMIT, MAX_PAGE_LIMIT, \
+                            next_cursor, paginate
+from ..queries import DEFAULT_SEARCH_LIMIT, MAX_SEARCH_LIMIT, \
+                        fuzzy_search, insert_car, insert_cars, \
+                        normalize_name, update_car_returning, \
+                        upsert_manufacturers
 from ..schemas import NAME_WITH_DIGITS, NAME_WITHOUT_DIGITS
+from ..serialization import page_json
+from ..settings import settings
+from ..stats import car_stats
+from ..versioning import CARS, MANUFACTURERS, bump_catalog_versions, \
+                            etag_matches, execute_and_bump, json_with_etag, \
+                            make_etag, not_modified, read_catalog_version
 
 
 cars_router = APIRouter(prefix='/cars', tags=['cars'])
 
+MAX_BULK_SIZE = 10000
+
+CAR_COLUMNS = (
+    Car.name, Car.color, Car.price, Car.id, Car.manufacturer_id,
+    Manufacturer.name.label('manufacturer_name')
+)
+
+NameFilter = Annotated[
+    str | None,
+    Query(max_length=50, pattern=NAME_WITH_DIGITS)
+]
+ColorFilter = Annotated[
+    str | None,
+    Query(max_length=50, pattern=NAME_WITHOUT_DIGITS)
+]
+ManufacturerFilter = Annotated[
+    str | None,
+    Query(max_length=50, pattern=NAME_WITHOUT_DIGITS)
+]
+PriceFilter = Annotated[Decimal | None, Query(ge=0)]
+
+CAR_SORT_KEYS = {
+    'id': ((Car.id,), False),
+    'price': ((Car.price, Car.id), False),
+    '-price': ((Car.price, Car.id), True),
+    'name': ((Car.name, Car.id), False),
+}
+
+
+def apply_car_filters(
+    query: Select,
+    name: str | None,
+    color: str | None,
+    manufacturer: str | None,
+    min_price: Decimal | None = None,
+    max_price: Decimal | None = None
+) -> Select:
+    '''Narrow cars query by equality filters and price range
+
+    Manufacturer is matched through its id, so filtering and sorting by
+    price is a range scan of the (manufacturer_id, price, id) index.
+    '''
+    if name:
+        query = query.where(Car.name == name.lower())
+
+    if color:
+        query = query.where(Car.color == color.lower())
+
+    if manufacturer:
+        query = query.where(
+            Car.manufacturer_id == select(Manufacturer.id)
+            .where(Manufacturer.name == manufacturer.lower())
+            .scalar_subquery()
+        )
+
+    if min_price is not None:
+        query = query.where(Car.price >= min_price)
+
+    if max_price is not None:
+        query = query.where(Car.price <= max_price)
+
+    return query
+
+
+def cars_query(
+    name: str | None = None,
+    color: str | None = None,
+    manufacturer: str | None = None,
+    min_price: Decimal | None = None,
+    max_price: Decimal | None = None
+) -> Select:
+    '''Filtered cars with manufacturer names, before ordering'''
+    return apply_car_filters(
+        select(*CAR_COLUMNS).join(Manufacturer),
+        name, color, manufacturer, min_price, max_price
+    )
+
+
+def cars_page_query(
+    query: Select,
+    sort: str = 'id',
+    cursor: str | None = None,
+    limit: int = DEFAULT_PAGE_LIMIT
+) -> Select:
+    '''Page of query in sort order'''
+    columns, descending = CAR_SORT_KEYS[sort]
+    return paginate(query, sort, columns, descending, cursor, limit)
+
+
+def search_cars_query(
+    session: AsyncSession,
+    q: str,
+    limit: int = DEFAULT_SEARCH_LIMIT
+) -> Select:
+    '''Best matches of cars by name'''
+    return fuzzy_search(
+        session,
+        select(*CAR_COLUMNS).join(Manufacturer),
+        Car.name, q
+    ).order_by(Car.id).limit(limit)
+
+
+def car_query(car_id: int) -> Select:
+    '''Single car with its manufacturer name'''
+    return select(Car, Manufacturer.name) \
+        .join(Manufacturer) \
+        .where(Car.id == car_id)
+
 
 @cars_router.post(
     '',
@@ -16,49 +149,225 @@ cars_router = APIRouter(prefix='/cars', tags=['cars'])
     status_code=status.HTTP_201_CREATED
 )
 async def create_car(
-    session: SessionDep,
+    session: WriteSessionDep,
     new_car: CarCreate
 ):
-    '''Create new car'''
-    input_manufacturer_name = new_car.manufacturer_name.lower()
-    manufacturer_result = await session.execute(
-        select(Manufacturer)
-        .where(Manufacturer.name == input_manufacturer_name)
-    )
-    manufacturer = manufacturer_result.scalars().first()
-    car_data = new_car.model_dump(exclude={'manufacturer_name'})
+    '''Create new car
+
+    Known manufacturer ids come from the cache, so usually this is a
+    single INSERT. The statement checks a cached id still has the name,
+    a stale one is dropped and the insert retried with the upsert.
+    '''
+    manufacturer_name = normalize_name(new_car.manufacturer_name)
+    manufacturer_id = manufacturer_ids.get(manufacturer_name)
+
+    try:
+        car = await insert_car(session, new_car, manufacturer_id)
+    except IntegrityError:
+        if manufacturer_id is None:
+            raise
+        await session.rollback()
+        manufacturer_ids.invalidate(manufacturer_name)
+        car = await insert_car(session, new_car)
 
-    if manufacturer:
-        car = Car(**car_data, manufacturer_id=manufacturer.id)
-    else:
-        new_manufacturer = Manufacturer(name=input_manufacturer_name)
-        session.add(new_manufacturer)
-        await session.flush()
-        car = Car(**car_data, manufacturer_id=new_manufacturer.id)
-
-    session.add(car)
     await session.commit()
+    manufacturer_ids.set(manufacturer_name, car.manufacturer_id)
+
+    return CarPublic.model_validate(car._mapping)
+
 
-    return CarPublic.model_validate(
-        {**car.model_dump(), 'manufacturer_name': input_manufacturer_name}
+@cars_router.post(
+    '/bulk',
+    response_model=CarBulkResult,
+    status_code=status.HTTP_200_OK
+)
+async def create_cars_bulk(
+    session: WriteSessionDep,
+    new_cars: Annotated[
+        list[Any],
+        Body(max_length=MAX_BULK_SIZE)
+    ]
+):
+    '''Create many cars at once
+
+    Items are validated one by one and invalid ones, including items that
+    are not objects, are reported by index. The rest are created with one
+    manufacturer upsert and one INSERT.
+    '''
+    items = [CarBulkItem(index=index) for index in range(len(new_cars))]
+    valid_items = []
+
+    for item, raw_car in zip(items, new_cars):
+        if not isinstance(raw_car, dict):
+            item.errors = ['item: Input should be an object']
+            continue
+        try:
+            valid_items.append((item, CarCreate.model_validate(raw_car)))
+        except ValidationError as exc:
+            item.errors = [
+                f"{'.'.join(map(str, error['loc']))}: {error['msg']}"
+                for error in exc.errors()
+            ]
+
+    if valid_items:
+        manufacturer_ids = await upsert_manufacturers(
+            session,
+            (new_car.manufacturer_name for _, new_car in valid_items)
+        )
+        car_rows = [
+            {
+                **new_car.model_dump(exclude={'manufacturer_name'}),
+                'name': normalize_name(new_car.name),
+                'color': normalize_name(new_car.color),
+                'manufacturer_id': manufacturer_ids[
+                    normalize_name(new_car.manufacturer_name)
+                ]
+            }
+            for _, new_car in valid_items
+        ]
+        car_ids = await insert_cars(session, car_rows)
+        await bump_catalog_versions(session, CARS, MANUFACTURERS)
+        await session.commit()
+
+        for (item, new_car), car_row, car_id in zip(
+            valid_items, car_rows, car_ids
+        ):
+            item.car = CarPublic.model_validate({
+                **car_row,
+                'id': car_id,
+                'manufacturer_name': normalize_name(new_car.manufacturer_name)
+            })
+
+    return CarBulkResult(
+        created=len(valid_items),
+        failed=len(items) - len(valid_items),
+        items=items
     )
 
 
+@cars_router.post(
+    '/import',
+    response_model=CarImportResult,
+    status_code=status.HTTP_200_OK,
+    openapi_extra={
+        'requestBody': {
+            'required': True,
+            'content': {'text/csv': {'schema': {'type': 'string'}}}
+        }
+    }
+)
+async def import_cars(
+    session: WriteSessionDep,
+    request: Request
+):
+    '''Import cars from CSV body with name,color,price,manufacturer_name
+
+    Body is streamed into a staging table with COPY and merged at once,
+    meant for loads too large for /cars/bulk.
+    '''
+    try:
+        return await import_cars_csv(session, iter_lines(request.stream()))
+    except CsvImportError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(exc)
+        ) from exc
+
+
+@cars_router.get(
+    '/stats',
+    response_model=CarStats,
+    status_code=status.HTTP_200_OK
+)
+async def read_cars_stats(session: ReadSessionDep):
+    '''Read count and price range of cars by manufacturer and by color
+
+    Served from the car_price_stats summary maintained by triggers.
+    '''
+    return await car_stats(session)
+
+
+@cars_router.get(
+    '/facets',
+    response_model=CarFacets,
+    status_code=status.HTTP_200_OK
+)
+async def read_cars_facets(
+    session: ReadSessionDep,
+    response: Response,
+    name: NameFilter = None,
+    color: ColorFilter = None,
+    manufacturer: ManufacturerFilter = None,
+    min_price: PriceFilter = None,
+    max_price: PriceFilter = None,
+    if_none_match: Annotated[str | None, Header()] = None
+):
+    '''Count filtered cars by color, manufacturer and price bucket
+
+    All facets come from one grouped query, cached per filter set and
+    cars change counter for FACET_CACHE_TTL seconds.
+    '''
+    filters = (name, color, manufacturer, min_price, max_price)
+    version = await read_catalog_version(session, CARS)
+    etag = make_etag('facets', CARS, version, *filters)
+
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+
+    facets = facet_cache.get((version, *filters))
+
+    if facets is None:
+        facets = await car_facets(
+            session, apply_car_filters(facet_query(), *filters)
+        )
+        facet_cache.set((version, *filters), facets)
+
+    response.headers['ETag'] = etag
+
+    return facets
+
+
+@cars_router.get(
+    '/search',
+    response_model=list[CarPublic],
+    status_code=status.HTTP_200_OK
+)
+async def search_cars(
+    session: ReadSessionDep,
+    q: Annotated[str, Query(min_length=1, max_length=50)],
+    limit: Annotated[
+        int,
+        Query(ge=1, le=MAX_SEARCH_LIMIT)
+    ] = DEFAULT_SEARCH_LIMIT
+):
+    '''Search cars by name, tolerating typos and partial input'''
+    result = await session.execute(search_cars_query(session, q, limit))
+
+    return [CarPublic.model_validate(row._mapping) for row in result]
+
+
 @cars_router.get(
     '/{car_id}',
     response_model=CarPublic,
     status_code=status.HTTP_200_OK
 )
 async def read_car(
-    session: SessionDep,
-    car_id: int
+    session: ReadSessionDep,
+    car_id: int,
+    if_none_match: Annotated[str | None, Header()] = None
 ):
-    '''Read single car'''
-    result = await session.execute(
-        select(Car, Manufacturer.name)
-        .join(Manufacturer)
-        .where(Car.id == car_id)
-    )
+    '''Read single car through the response cache
+
+    Car writes drop its entry, manufacturer renames every entry tagged
+    with the manufacturer. ETag is a digest of the body, so a cached car
+    is revalidated without touching the database.
+    '''
+    cached = await response_cache.get(car_key(car_id))
+
+    if cached is not None:
+        return json_with_etag(cached, if_none_match)
+
+    result = await session.execute(car_query(car_id))
 
     row = result.first()
 
@@ -66,53 +375,93 @@ async def read_car(
         raise HTTPException(status_code=404, detail='Car not found')
 
     car, manufacturer_name = row
-
-    return CarPublic.model_validate(
+    body = CarPublic.model_validate(
         {**car.model_dump(), 'manufacturer_name': manufacturer_name}
+    ).model_dump_json().encode()
+
+    await response_cache.set(
+        car_key(car_id),
+        body,
+        tags=[manufacturer_cars_tag(car.manufacturer_id)]
     )
 
+    return json_with_etag(body, if_none_match)
+
 
 @cars_router.get(
     '',
-    response_model=list[CarPublic],
-    status_code=status.HTTP_200_OK
+    response_model=CarPage,
+    status_code=status.HTTP_200_OK,
+    responses={
+        status.HTTP_200_OK: {
+            'content': {media_type: {} for media_type in EXPORT_MEDIA_TYPES}
+        }
+    }
 )
 async def read_cars(
-    session: SessionDep,
-    name: Annotated[
-        str | None,
-        Query(max_length=50, pattern=NAME_WITH_DIGITS)
-    ] = None,
-    color: Annotated[
-        str | None,
-        Query(max_length=50, pattern=NAME_WITHOUT_DIGITS)
-    ] = None,
-    manufacturer: Annotated[
-        str | None,
-        Query(max_length=50, pattern=NAME_WITHOUT_DIGITS)
-    ] = None
+    session: ReadSessionDep,
+    response: Response,
+    name: NameFilter = None,
+    color: ColorFilter = None,
+    manufacturer: ManufacturerFilter = None,
+    min_price: PriceFilter = None,
+    max_price: PriceFilter = None,
+    sort: Literal['id', 'price', '-price', 'name'] = 'id',
+    limit: Annotated[int, Query(ge=1, le=MAX_PAGE_LIMIT)] = DEFAULT_PAGE_LIMIT,
+    cursor: str | None = None,
+    accept: Annotated[str | None, Header()] = None,
+    if_none_match: Annotated[str | None, Header()] = None
 ):
-    '''Read multiple cars'''
-    query = select(Car, Manufacturer.name).join(Manufacturer)
+    '''Read page of cars
+
+    With Accept: application/x-ndjson or text/csv the whole filtered
+    catalog is streamed ordered by id instead, ignoring pagination.
+    ETag follows the cars change counter, so an unchanged catalog is
+    revalidated without running the query. With FAST_SERIALIZATION the
+    page is encoded straight from rows, skipping pydantic.
+    '''
+    export_media_type = negotiate_export(accept)
+    etag = make_etag(
+        CARS, await read_catalog_version(session, CARS),
+        name, color, manufacturer, min_price, max_price,
+        sort, limit, cursor, export_media_type
+    )
 
-    if name:
-        query = query.where(Car.name == name.lower())
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
 
-    if color:
-        query = query.where(Car.color == color.lower())
+    query = cars_query(name, color, manufacturer, min_price, max_price)
 
-    if manufacturer:
-        query = query.where(Manufacturer.name == manufacturer.lower())
+    if export_media_type:
+        return StreamingResponse(
+            stream_cars(session, query.order_by(Car.id), export_media_type),
+            media_type=export_media_type,
+            headers={'ETag': etag}
+        )
 
-    result = await session.execute(query)
-    rows = result.all()
+    result = await session.execute(
+        cars_page_query(query, sort, cursor, limit)
+    )
+    rows = list(result.all())
+    columns, _ = CAR_SORT_KEYS[sort]
+    cursor = next_cursor(
+        rows, sort, limit,
+        lambda row: [getattr(row, column.key) for column in columns]
+    )
 
-    return [
-        CarPublic.model_validate(
-            {**car.model_dump(), 'manufacturer_name': manufacturer_name}
+    if settings.FAST_SERIALIZATION:
+        return Response(
+            content=page_json(CarPublic, rows, cursor),
+            media_type='application/json',
+            headers={'ETag': etag}
         )
-        for car, manufacturer_name in rows
-    ]
+
+    response.headers['ETag'] = etag
+
+    return CarPage(
+        items=[CarPublic.model_validate(row._mapping) for row in rows],
+        next_cursor=cursor
+    )
 
 
 @cars_router.put(
@@ -121,56 +470,47 @@ async def read_cars(
     status_code=status.HTTP_200_OK
 )
 async def update_car(
-    session: SessionDep,
+    session: WriteSessionDep,
     car_id: int,
     new_car_data: CarUpdate
 ):
-    '''Update car'''
-    car_result = await session.execute(
-        select(Car)
-        .where(Car.id == car_id)
-    )
-
-    car = car_result.scalars().first()
-
-    if not car:
-        raise HTTPException(status_code=404, detail='Car not found')
+    '''Update car with a single UPDATE ... RETURNING
 
+    Missing car is told by an empty result. Manufacturer ids are resolved
+    through the cache the same way as on create.
+    '''
     update_data = new_car_data.model_dump(exclude_unset=True)
     manufacturer_name = update_data.pop('manufacturer_name', None)
+    manufacturer_id = None
 
     if manufacturer_name is not None:
-        manufacturer_result = await session.execute(
-            select(Manufacturer)
-            .where(Manufacturer.name == manufacturer_name)
-        )
-
-        manufacturer = manufacturer_result.scalars().first()
+        manufacturer_name = normalize_name(manufacturer_name)
+        manufacturer_id = manufacturer_ids.get(manufacturer_name)
 
-        if manufacturer:
-            car.manufacturer_id = manufacturer.id
-        else:
-            new_manufacturer = Manufacturer(name=manufacturer_name)
-            session.add(new_manufacturer)
-            await session.flush()
-            car.manufacturer_id = new_manufacturer.id
-
-    if update_data:
-        car.sqlmodel_update(update_data)
-
-    if manufacturer_name is None:
-        manufacturer_name_result = await session.execute(
-            select(Manufacturer.name)
-            .where(Manufacturer.id == car.manufacturer_id)
+    try:
+        car = await update_car_returning(
+            session, car_id, update_data, manufacturer_name, manufacturer_id
+        )
+    except IntegrityError:
+        if manufacturer_id is None:
+            raise
+        await session.rollback()
+        manufacturer_ids.invalidate(manufacturer_name)
+        car = await update_car_returning(
+            session, car_id, update_data, manufacturer_name
         )
-        manufacturer_name = manufacturer_name_result.scalars().first()
 
-    session.add(car)
+    if car is None:
+        await session.rollback()
+        raise HTTPException(status_code=404, detail='Car not found')
+
     await session.commit()
+    await invalidate_responses(car_key(car_id))
 
-    return CarPublic.model_validate(
-        {**car.model_dump(), 'manufacturer_name': manufacturer_name}
-    )
+    if manufacturer_name is not None:
+        manufacturer_ids.set(manufacturer_name, car.manufacturer_id)
+
+    return CarPublic.model_validate(car._mapping)
 
 
 @cars_router.delete(
@@ -178,24 +518,25 @@ async def update_car(
     status_code=status.HTTP_200_OK
 )
 async def delete_car(
-    session: SessionDep,
+    session: WriteSessionDep,
     car_id: int
 ):
-    '''Delete car'''
-    result = await session.execute(
-        select(Car)
-        .where(Car.id == car_id)
+    '''Delete car with a single DELETE ... RETURNING'''
+    cars = Car.__table__
+    car = await execute_and_bump(
+        session,
+        delete(cars).where(cars.c.id == car_id).returning(cars.c.id),
+        CARS
     )
 
-    car = result.scalars().first()
-
     if car is None:
+        await session.rollback()
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail='Car not found'
         )
 
-    await session.delete(car)
     await session.commit()
+    await invalidate_responses(car_key(car_id))
 
     return {'message': 'deleted'}
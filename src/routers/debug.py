@@ -0,0 +1,34 @@
+'''Debug router'''
+from fastapi import APIRouter, status
+from ..cache import manufacturer_ids
+from .. import database
+
+
+debug_router = APIRouter(
+    prefix='/debug',
+    tags=['debug'],
+    include_in_schema=False
+)
+
+
+@debug_router.get(
+    '/pool',
+    status_code=status.HTTP_200_OK
+)
+async def read_pool_stats():
+    '''Connection pool saturation and checkout wait times'''
+    return {
+        **database.async_engine.pool.stats(),
+        'replicas': [
+            engine.pool.stats() for engine in database.replicas.engines
+        ]
+    }
+
+
+@debug_router.get(
+    '/cache',
+    status_code=status.HTTP_200_OK
+)
+async def read_cache_stats():
+    '''Manufacturer id cache size and hit/miss counters'''
+    return manufacturer_ids.stats()
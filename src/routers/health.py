@@ -0,0 +1,38 @@
+'''Health router'''
+from fastapi import APIRouter, Request, status
+from fastapi.responses import JSONResponse
+
+
+health_router = APIRouter(
+    prefix='/health',
+    tags=['health'],
+    include_in_schema=False
+)
+
+
+@health_router.get(
+    '/live',
+    status_code=status.HTTP_200_OK
+)
+async def read_liveness():
+    '''Process is up and serving requests'''
+    return {'status': 'live'}
+
+
+@health_router.get(
+    '/ready',
+    status_code=status.HTTP_200_OK
+)
+async def read_readiness(request: Request):
+    '''Warm-up finished, so traffic can be routed here
+
+    Workers accept connections only after their warm-up, so whichever
+    one answers is warm, and workers still warming up take no requests.
+    '''
+    if not getattr(request.app.state, 'ready', False):
+        return JSONResponse(
+            {'status': 'warming up'},
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE
+        )
+
+    return {'status': 'ready'}
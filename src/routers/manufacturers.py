@@ -1,10 +1,27 @@
 '''Manufacturers router'''
-from fastapi import APIRouter, HTTPException, status
-from sqlalchemy import select
-from ..database import SessionDep
-from ..models import Manufacturer, ManufacturerPublic, \
-                        ManufacturerCreate, ManufacturerUpdate, \
-                        Car
+from typing import Annotated
+from fastapi import APIRouter, HTTPException, status, Header, Query, \
+                    Response
+from sqlalchemy import Select, delete, exists, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..cache import invalidate_responses, manufacturer_cars_tag, \
+                    manufacturer_ids, manufacturer_key, response_cache
+from ..database import ReadSessionDep, WriteSessionDep, \
+                        is_unique_violation
+from ..models import Manufacturer, ManufacturerPage, ManufacturerPublic, \
+                        ManufacturerCreate, ManufacturerStats, \
+                        ManufacturerUpdate, Car
+from ..pagination import DEFAULT_PAGE_LIMIT, MAX_PAGE_LIMIT, \
+                            next_cursor, paginate
+from ..queries import DEFAULT_SEARCH_LIMIT, MAX_SEARCH_LIMIT, \
+                        fuzzy_search, normalize_fields
+from ..serialization import page_json
+from ..settings import settings
+from ..stats import manufacturer_stats
+from ..versioning import CARS, MANUFACTURERS, bump_catalog_versions, \
+                            etag_matches, execute_and_bump, json_with_etag, \
+                            make_etag, not_modified, read_catalog_version
 
 
 manufacturer_router = APIRouter(
@@ -13,13 +30,47 @@ manufacturer_router = APIRouter(
 )
 
 
+def manufacturers_page_query(
+    cursor: str | None = None,
+    limit: int = DEFAULT_PAGE_LIMIT
+) -> Select:
+    '''Page of manufacturers ordered by id'''
+    return paginate(
+        select(Manufacturer.name, Manufacturer.id),
+        'id', (Manufacturer.id,), False, cursor, limit
+    )
+
+
+def search_manufacturers_query(
+    session: AsyncSession,
+    q: str,
+    limit: int = DEFAULT_SEARCH_LIMIT
+) -> Select:
+    '''Best matches of manufacturers by name'''
+    return fuzzy_search(
+        session,
+        select(Manufacturer.name, Manufacturer.id),
+        Manufacturer.name, q
+    ).limit(limit)
+
+
+def manufacturer_query(manufacturer_id: int) -> Select:
+    '''Single manufacturer'''
+    return select(Manufacturer).where(Manufacturer.id == manufacturer_id)
+
+
+def manufacturer_exists_query(manufacturer_id: int) -> Select:
+    '''Id of manufacturer, empty if there is none'''
+    return select(Manufacturer.id).where(Manufacturer.id == manufacturer_id)
+
+
 @manufacturer_router.post(
     '',
     response_model=ManufacturerPublic,
     status_code=status.HTTP_201_CREATED
 )
 async def create_manufacturer(
-    session: SessionDep,
+    session: WriteSessionDep,
     new_manufacturer: ManufacturerCreate
 ):
     '''Create new manufacturer'''
@@ -36,25 +87,51 @@ async def create_manufacturer(
 
     manufacturer = Manufacturer.model_validate(new_manufacturer)
     session.add(manufacturer)
+    await bump_catalog_versions(session, MANUFACTURERS)
     await session.commit()
+    manufacturer_ids.invalidate(manufacturer.name)
 
     return manufacturer
 
 
+@manufacturer_router.get(
+    '/search',
+    response_model=list[ManufacturerPublic],
+    status_code=status.HTTP_200_OK
+)
+async def search_manufacturers(
+    session: ReadSessionDep,
+    q: Annotated[str, Query(min_length=1, max_length=50)],
+    limit: Annotated[
+        int,
+        Query(ge=1, le=MAX_SEARCH_LIMIT)
+    ] = DEFAULT_SEARCH_LIMIT
+):
+    '''Search manufacturers by name, tolerating typos and partial input'''
+    result = await session.execute(
+        search_manufacturers_query(session, q, limit)
+    )
+
+    return [ManufacturerPublic.model_validate(row._mapping) for row in result]
+
+
 @manufacturer_router.get(
     '/{manufacturer_id}',
     response_model=ManufacturerPublic,
     status_code=status.HTTP_200_OK
 )
 async def read_manufacturer(
-    session: SessionDep,
-    manufacturer_id: int
+    session: ReadSessionDep,
+    manufacturer_id: int,
+    if_none_match: Annotated[str | None, Header()] = None
 ):
-    '''Read single manufacturer'''
-    result = await session.execute(
-        select(Manufacturer)
-        .where(Manufacturer.id == manufacturer_id)
-    )
+    '''Read single manufacturer through the response cache'''
+    cached = await response_cache.get(manufacturer_key(manufacturer_id))
+
+    if cached is not None:
+        return json_with_etag(cached, if_none_match)
+
+    result = await session.execute(manufacturer_query(manufacturer_id))
 
     manufacturer = result.scalars().first()
 
@@ -64,25 +141,81 @@ async def read_manufacturer(
             detail='Manufacturer not found'
         )
 
-    return manufacturer
+    body = ManufacturerPublic.model_validate(
+        manufacturer
+    ).model_dump_json().encode()
+    await response_cache.set(manufacturer_key(manufacturer_id), body)
+
+    return json_with_etag(body, if_none_match)
+
+
+@manufacturer_router.get(
+    '/{manufacturer_id}/stats',
+    response_model=ManufacturerStats,
+    status_code=status.HTTP_200_OK
+)
+async def read_manufacturer_stats(
+    session: ReadSessionDep,
+    manufacturer_id: int
+):
+    '''Read count and price range of manufacturer cars, also by color'''
+    stats = await manufacturer_stats(session, manufacturer_id)
+
+    if stats['total'] is None:
+        result = await session.execute(
+            manufacturer_exists_query(manufacturer_id)
+        )
+
+        if result.scalars().first() is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail='Manufacturer not found'
+            )
+
+    return stats
 
 
 @manufacturer_router.get(
     '',
-    response_model=list[ManufacturerPublic],
+    response_model=ManufacturerPage,
     status_code=status.HTTP_200_OK
 )
 async def read_manufacturers(
-    session: SessionDep,
+    session: ReadSessionDep,
+    response: Response,
+    limit: Annotated[int, Query(ge=1, le=MAX_PAGE_LIMIT)] = DEFAULT_PAGE_LIMIT,
+    cursor: str | None = None,
+    if_none_match: Annotated[str | None, Header()] = None
 ):
-    '''Read multiple manufacturers'''
-    result = await session.execute(
-        select(Manufacturer)
+    '''Read page of manufacturers'''
+    etag = make_etag(
+        MANUFACTURERS, await read_catalog_version(session, MANUFACTURERS),
+        limit, cursor
     )
 
-    manufacturers = result.scalars().all()
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+
+    result = await session.execute(manufacturers_page_query(cursor, limit))
+
+    rows = list(result.all())
+    cursor = next_cursor(rows, 'id', limit, lambda row: [row.id])
+
+    if settings.FAST_SERIALIZATION:
+        return Response(
+            content=page_json(ManufacturerPublic, rows, cursor),
+            media_type='application/json',
+            headers={'ETag': etag}
+        )
+
+    response.headers['ETag'] = etag
 
-    return manufacturers
+    return ManufacturerPage(
+        items=[
+            ManufacturerPublic.model_validate(row._mapping) for row in rows
+        ],
+        next_cursor=cursor
+    )
 
 
 @manufacturer_router.put(
@@ -91,32 +224,54 @@ async def read_manufacturers(
     status_code=status.HTTP_200_OK
 )
 async def update_manufacturer(
-    session: SessionDep,
+    session: WriteSessionDep,
     manufacturer_id: int,
     new_manufacturer_data: ManufacturerUpdate
 ):
-    '''Update manufacturer'''
-    result = await session.execute(
-        select(Manufacturer)
-        .where(Manufacturer.id == manufacturer_id)
+    '''Update manufacturer with a single UPDATE ... RETURNING
+
+    Missing manufacturer is told by an empty result, a taken name by
+    a violation of the unique constraint.
+    '''
+    values = normalize_fields(
+        new_manufacturer_data.model_dump(exclude_unset=True), ('name',)
     )
+    manufacturers = Manufacturer.__table__
 
-    manufacturer = result.scalars().first()
+    try:
+        manufacturer = await execute_and_bump(
+            session,
+            update(manufacturers)
+            .where(manufacturers.c.id == manufacturer_id)
+            .values(values or {'id': manufacturers.c.id})
+            .returning(manufacturers.c.name, manufacturers.c.id),
+            MANUFACTURERS, CARS
+        )
+    except IntegrityError as exc:
+        await session.rollback()
+        if not is_unique_violation(exc):
+            raise
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail='Manufacturer with that name already exists'
+        ) from exc
 
     if manufacturer is None:
+        await session.rollback()
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail='Manufacturer not found'
         )
 
-    manufacturer.sqlmodel_update(
-        new_manufacturer_data.model_dump(exclude_unset=True)
-    )
-
-    session.add(manufacturer)
     await session.commit()
+    manufacturer_ids.invalidate_value(manufacturer_id)
+    manufacturer_ids.invalidate(manufacturer.name)
+    await invalidate_responses(
+        manufacturer_key(manufacturer_id),
+        tags=[manufacturer_cars_tag(manufacturer_id)]
+    )
 
-    return manufacturer
+    return ManufacturerPublic.model_validate(manufacturer._mapping)
 
 
 @manufacturer_router.delete(
@@ -124,33 +279,49 @@ async def update_manufacturer(
     status_code=status.HTTP_200_OK
 )
 async def delete_manufacturer(
-    session: SessionDep,
+    session: WriteSessionDep,
     manufacturer_id: int
 ):
-    '''Delete manufacturer'''
-    result = await session.execute(
-        select(Manufacturer)
-        .where(Manufacturer.id == manufacturer_id)
-    )
+    '''Delete manufacturer unless a car depends on it
 
-    manufacturer = result.scalars().first()
+    One DELETE ... WHERE NOT EXISTS ... RETURNING, only an empty result
+    costs one more lookup to tell a missing manufacturer from a used one.
+    '''
+    manufacturers = Manufacturer.__table__
+    cars = Car.__table__
+    manufacturer = await execute_and_bump(
+        session,
+        delete(manufacturers)
+        .where(
+            manufacturers.c.id == manufacturer_id,
+            ~exists().where(cars.c.manufacturer_id == manufacturer_id)
+        )
+        .returning(manufacturers.c.name),
+        MANUFACTURERS
+    )
 
     if manufacturer is None:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail='Manufacturer not found'
+        await session.rollback()
+        result = await session.execute(
+            manufacturer_exists_query(manufacturer_id)
         )
-    car_result = await session.execute(
-        select(Car.manufacturer_id)
-        .where(Car.manufacturer_id == manufacturer.id)
-    )
-    if car_result.scalars().first():
+
+        if result.scalars().first() is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail='Manufacturer not found'
+            )
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail='Can\'t remove manufacturer'
             ' when at least one car depends on it'
         )
-    await session.delete(manufacturer)
+
     await session.commit()
+    manufacturer_ids.invalidate(manufacturer.name)
+    await invalidate_responses(
+        manufacturer_key(manufacturer_id),
+        tags=[manufacturer_cars_tag(manufacturer_id)]
+    )
 
     return {'message': 'deleted'}
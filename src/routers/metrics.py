@@ -0,0 +1,22 @@
+'''Metrics router'''
+from fastapi import APIRouter, status
+from fastapi.responses import PlainTextResponse
+from ..metrics import registry
+
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+metrics_router = APIRouter(tags=['metrics'], include_in_schema=False)
+
+
+@metrics_router.get(
+    '/metrics',
+    status_code=status.HTTP_200_OK,
+    response_class=PlainTextResponse
+)
+async def read_metrics():
+    '''Request and database metrics in Prometheus text format'''
+    return PlainTextResponse(
+        registry.render(),
+        media_type=PROMETHEUS_CONTENT_TYPE
+    )
@@ -0,0 +1,41 @@
+'''Response serialization module'''
+import json
+from decimal import Decimal
+from typing import Any, Iterable, Sequence
+from sqlmodel import SQLModel
+
+
+def json_default(value: Any) -> str:
+    '''Serialize Decimal the same way pydantic does'''
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError(f'{type(value).__name__} is not JSON serializable')
+
+
+def dump_json(content: Any) -> bytes:
+    '''Encode content with the options of starlette JSONResponse'''
+    return json.dumps(
+        content,
+        ensure_ascii=False,
+        allow_nan=False,
+        indent=None,
+        separators=(',', ':'),
+        default=json_default
+    ).encode('utf-8')
+
+
+def page_json(
+    model: type[SQLModel],
+    rows: Iterable[Sequence],
+    next_cursor: str | None
+) -> bytes:
+    '''Encode page of plain rows without building pydantic models
+
+    Rows must hold columns in the field order of model, output is the
+    same as FastAPI gives for a page of model items.
+    '''
+    fields = tuple(model.model_fields)
+    return dump_json({
+        'items': [dict(zip(fields, row)) for row in rows],
+        'next_cursor': next_cursor
+    })
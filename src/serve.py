@@ -0,0 +1,45 @@
+'''Production server with several worker processes
+
+Usage: WORKERS=16 python -m src.serve --host 0.0.0.0 --port 8000
+
+Starts WORKERS uvicorn processes sharing the socket, on uvloop and
+httptools when installed. Each worker creates its own engines in the
+application lifespan and gets an equal share of POOL_SIZE and
+MAX_OVERFLOW, so their sum bounds connections of the whole server.
+
+Caches live in each worker. Facet entries are keyed by catalog version
+and a cached manufacturer id is checked against its name by the
+statement using it, so neither relies on invalidation by the worker that
+wrote. Response cache entries are dropped on write, with the default
+memory backend only in the worker that wrote, others serve the old body
+for up to RESPONSE_CACHE_TTL. Use CACHE_BACKEND=redis with several
+workers.
+'''
+import argparse
+import uvicorn
+from .settings import settings
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    '''Command line options'''
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    return parser.parse_args(argv)
+
+
+def main(args: argparse.Namespace) -> None:
+    '''Run uvicorn with WORKERS processes'''
+    uvicorn.run(
+        'src.main:app',
+        host=args.host,
+        port=args.port,
+        workers=settings.WORKERS,
+        loop='auto',
+        http='auto',
+        lifespan='on'
+    )
+
+
+if __name__ == '__main__':
+    main(parse_args())
@@ -1,4 +1,5 @@
 '''Global settings module'''
+from typing import Literal
 from pydantic_settings import BaseSettings
 from pydantic import ConfigDict
 
@@ -10,6 +11,41 @@ class Settings(BaseSettings):
     POSTGRES_PASSWORD: str
     POSTGRES_HOST: str
     POSTGRES_DB: str
+    DEBUG: bool = True
+    POOL_DEBUG: bool = True
+    WORKERS: int = 1
+    WARMUP: bool = True
+    WARMUP_CONNECTIONS: int = 0
+    WARMUP_RETRY_SECONDS: float = 1
+    OPENAPI_FILE: str = ''
+    POOL_SIZE: int = 5
+    MAX_OVERFLOW: int = 10
+    POOL_TIMEOUT: float = 30
+    POOL_RECYCLE: int = -1
+    POOL_PRE_PING: bool = False
+    STATEMENT_CACHE_SIZE: int = 100
+    PREPARED_STATEMENT_CACHE_SIZE: int = 100
+    REPLICA_URLS: list[str] = []
+    REPLICA_SELECTION: Literal['round_robin', 'least_busy'] = 'round_robin'
+    READ_YOUR_WRITES_SECONDS: float = 0
+    MANUFACTURER_CACHE_SIZE: int = 1024
+    MANUFACTURER_CACHE_TTL: float = 60
+    CACHE_BACKEND: Literal['memory', 'redis'] = 'memory'
+    CACHE_URL: str = 'redis://localhost:6379/0'
+    RESPONSE_CACHE_SIZE: int = 10000
+    RESPONSE_CACHE_TTL: float = 60
+    FACET_CACHE_SIZE: int = 1024
+    FACET_CACHE_TTL: float = 10
+    FAST_SERIALIZATION: bool = False
+    METRICS: bool = True
+    DB_QUERY_HEADERS: bool = False
+    N_PLUS_ONE_THRESHOLD: int = 0
+    SLOW_QUERY_MS: float = 0
+    SLOW_QUERY_EXPLAIN_RATE: float = 0
+    SLOW_QUERY_EXPLAIN_TIMEOUT_MS: float = 10000
+    SLOW_QUERY_LOG: str = 'slow_queries.log'
+    SLOW_QUERY_LOG_BYTES: int = 10 * 1024 * 1024
+    SLOW_QUERY_LOG_BACKUPS: int = 5
 
     @property
     def database_url(self) -> str:
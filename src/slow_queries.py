@@ -0,0 +1,176 @@
+'''Slow query log module
+
+Statements slower than SLOW_QUERY_MS are written as JSON lines to a
+rotating log file, with the route being served and the shape of bound
+parameters, names and types but no values. A SLOW_QUERY_EXPLAIN_RATE
+fraction of slow read statements on PostgreSQL is run again under
+EXPLAIN (ANALYZE, BUFFERS) on a separate connection, in the background
+and rolled back, and logged with its plan. The background task runs
+outside the context of the request, so its statements are not counted
+toward it.
+'''
+import asyncio
+import contextvars
+import json
+import logging
+import random
+import time
+from datetime import datetime, timezone
+from logging.handlers import RotatingFileHandler
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine
+from .metrics import current_request, route_template
+from .settings import settings
+
+
+logger = logging.getLogger(__name__)
+
+EXPLAINED = ('select',)
+EXPLAIN_DIALECTS = ('postgresql',)
+EXPLAIN_PREFIX = 'EXPLAIN (ANALYZE'
+
+# background EXPLAIN tasks, also keeps them from being garbage collected
+explains: set[asyncio.Task] = set()
+
+
+def configure_slow_query_log(path: str) -> RotatingFileHandler:
+    '''Send slow query records to a rotating file only'''
+    handler = RotatingFileHandler(
+        path,
+        maxBytes=settings.SLOW_QUERY_LOG_BYTES,
+        backupCount=settings.SLOW_QUERY_LOG_BACKUPS,
+        encoding='utf-8'
+    )
+    handler.setFormatter(logging.Formatter('%(message)s'))
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    return handler
+
+
+def value_shape(value) -> str:
+    '''Type of bound value, with length of sequences'''
+    if isinstance(value, (list, tuple)):
+        return f'{type(value).__name__}[{len(value)}]'
+    return type(value).__name__
+
+
+def parameter_shape(parameters, executemany: bool) -> dict:
+    '''Names and types of bound parameters without their values'''
+    rows = parameters if executemany else [parameters]
+    first = rows[0] if rows else {}
+
+    if isinstance(first, dict):
+        shape = {name: value_shape(value) for name, value in first.items()}
+    else:
+        shape = {
+            str(position): value_shape(value)
+            for position, value in enumerate(first or (), 1)
+        }
+
+    return {'rows': len(rows), 'types': shape}
+
+
+def request_route() -> str | None:
+    '''Method and route template of the request being served'''
+    metrics = current_request.get()
+    if metrics is None or not metrics.scope:
+        return None
+    return f'{metrics.scope["method"]} {route_template(metrics.scope)}'
+
+
+def write_record(record: dict) -> None:
+    '''Log record as a JSON line'''
+    logger.warning(json.dumps(record, default=str))
+
+
+async def explain(engine: Engine, record: dict, statement: str, parameters):
+    '''Log record with plan of statement, changes are rolled back'''
+    try:
+        async with AsyncEngine(engine).connect() as conn:
+            await conn.exec_driver_sql(
+                'SET LOCAL statement_timeout = '
+                f'{int(settings.SLOW_QUERY_EXPLAIN_TIMEOUT_MS)}'
+            )
+            result = await conn.exec_driver_sql(
+                f'{EXPLAIN_PREFIX}, BUFFERS, FORMAT JSON) {statement}',
+                parameters
+            )
+            plan = result.scalar()
+            await conn.rollback()
+        record['plan'] = json.loads(plan) if isinstance(plan, str) else plan
+    except Exception as exc:  # pylint: disable=broad-exception-caught
+        record['explain_error'] = str(exc)
+
+    write_record(record)
+
+
+def should_explain(conn, statement: str, executemany: bool) -> bool:
+    '''Whether to sample plan of slow statement'''
+    return (
+        conn.dialect.name in EXPLAIN_DIALECTS
+        and not executemany
+        and statement.lstrip().lower().startswith(EXPLAINED)
+        and not explains
+        and random.random() < settings.SLOW_QUERY_EXPLAIN_RATE
+    )
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def before_cursor_execute(
+    conn, cursor, statement, parameters, context, executemany
+):
+    '''Remember statement start when the slow query log is on'''
+    # pylint: disable=unused-argument,too-many-arguments
+    if settings.SLOW_QUERY_MS > 0 and \
+            not statement.startswith(EXPLAIN_PREFIX):
+        conn.info.setdefault('slow_query_start', []).append(
+            time.perf_counter()
+        )
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def after_cursor_execute(
+    conn, cursor, statement, parameters, context, executemany
+):
+    '''Log statement slower than the threshold'''
+    # pylint: disable=unused-argument,too-many-arguments
+    starts = conn.info.get('slow_query_start')
+    if not starts:
+        return
+
+    duration_ms = (time.perf_counter() - starts.pop()) * 1000
+    if duration_ms < settings.SLOW_QUERY_MS:
+        return
+
+    record = {
+        'time': datetime.now(timezone.utc).isoformat(),
+        'duration_ms': round(duration_ms, 3),
+        'route': request_route(),
+        'statement': statement,
+        'parameters': parameter_shape(parameters, executemany),
+    }
+
+    if should_explain(conn, statement, executemany):
+        context = contextvars.copy_context()
+        context.run(current_request.set, None)
+        task = asyncio.get_running_loop().create_task(
+            explain(conn.engine, record, statement, parameters),
+            context=context
+        )
+        explains.add(task)
+        task.add_done_callback(explains.discard)
+    else:
+        write_record(record)
+
+
+@event.listens_for(Engine, 'handle_error')
+def handle_error(exception_context):
+    '''Forget start of statement that failed'''
+    conn = exception_context.connection
+    if conn is not None and \
+            exception_context.execution_context is not None:
+        starts = conn.info.get('slow_query_start')
+        if starts:
+            starts.pop()
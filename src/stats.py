@@ -0,0 +1,256 @@
+'''Car price statistics module
+
+car_price_stats holds count, sum and range of prices per manufacturer and
+color, kept current by triggers on cars so that every write path, the
+ORM, set-based statements and CSV import alike, updates it. Statistics
+are read by summing its rows instead of aggregating cars.
+
+Deployed schemas get the triggers from Alembic revision 7b3c8e1f9a04.
+The same DDL is attached to create_all for the schemas of the tests and
+the load benchmark, which may run it against an existing database, so
+it is idempotent.
+'''
+from decimal import Decimal
+from typing import Iterable
+from sqlalchemy import DDL, Row, event, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlmodel import SQLModel
+from .models import CarPriceStats, Manufacturer
+
+
+CENT = Decimal('0.01')
+
+POSTGRESQL_STATS_DDL = (
+    '''
+    CREATE OR REPLACE FUNCTION car_price_stats_add() RETURNS trigger
+    LANGUAGE plpgsql AS $$
+    BEGIN
+        INSERT INTO car_price_stats AS stats
+            (manufacturer_id, color, cars, price_total, price_min, price_max)
+        SELECT manufacturer_id, color, count(*), sum(price),
+            min(price), max(price)
+        FROM new_rows
+        GROUP BY manufacturer_id, color
+        ORDER BY manufacturer_id, color
+        ON CONFLICT (manufacturer_id, color) DO UPDATE SET
+            cars = stats.cars + excluded.cars,
+            price_total = stats.price_total + excluded.price_total,
+            price_min = least(stats.price_min, excluded.price_min),
+            price_max = greatest(stats.price_max, excluded.price_max);
+        RETURN NULL;
+    END
+    $$
+    ''',
+    '''
+    CREATE OR REPLACE FUNCTION car_price_stats_remove() RETURNS trigger
+    LANGUAGE plpgsql AS $$
+    BEGIN
+        UPDATE car_price_stats AS stats SET
+            cars = stats.cars - removed.cars,
+            price_total = stats.price_total - removed.price_total,
+            price_min = CASE WHEN removed.price_min > stats.price_min
+                THEN stats.price_min
+                ELSE coalesce((
+                    SELECT min(cars.price) FROM cars
+                    WHERE cars.manufacturer_id = stats.manufacturer_id
+                    AND cars.color = stats.color
+                ), stats.price_min) END,
+            price_max = CASE WHEN removed.price_max < stats.price_max
+                THEN stats.price_max
+                ELSE coalesce((
+                    SELECT max(cars.price) FROM cars
+                    WHERE cars.manufacturer_id = stats.manufacturer_id
+                    AND cars.color = stats.color
+                ), stats.price_max) END
+        FROM (
+            SELECT manufacturer_id, color, count(*) AS cars,
+                sum(price) AS price_total,
+                min(price) AS price_min, max(price) AS price_max
+            FROM old_rows
+            GROUP BY manufacturer_id, color
+        ) AS removed
+        WHERE stats.manufacturer_id = removed.manufacturer_id
+        AND stats.color = removed.color;
+
+        DELETE FROM car_price_stats WHERE cars <= 0;
+        RETURN NULL;
+    END
+    $$
+    ''',
+    '''
+    CREATE OR REPLACE TRIGGER cars_price_stats_insert AFTER INSERT ON cars
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION car_price_stats_add()
+    ''',
+    '''
+    CREATE OR REPLACE TRIGGER cars_price_stats_update_new AFTER UPDATE ON cars
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION car_price_stats_add()
+    ''',
+    '''
+    CREATE OR REPLACE TRIGGER cars_price_stats_update_old AFTER UPDATE ON cars
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION car_price_stats_remove()
+    ''',
+    '''
+    CREATE OR REPLACE TRIGGER cars_price_stats_delete AFTER DELETE ON cars
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION car_price_stats_remove()
+    ''',
+)
+
+SQLITE_STATS_ADD = '''
+    INSERT INTO car_price_stats
+        (manufacturer_id, color, cars, price_total, price_min, price_max)
+    VALUES (NEW.manufacturer_id, NEW.color, 1, NEW.price, NEW.price, NEW.price)
+    ON CONFLICT (manufacturer_id, color) DO UPDATE SET
+        cars = cars + 1,
+        price_total = price_total + excluded.price_total,
+        price_min = min(price_min, excluded.price_min),
+        price_max = max(price_max, excluded.price_max);
+'''
+
+SQLITE_STATS_REMOVE = '''
+    UPDATE car_price_stats SET
+        cars = cars - 1,
+        price_total = price_total - OLD.price,
+        price_min = CASE WHEN OLD.price > price_min THEN price_min
+            ELSE coalesce((
+                SELECT min(cars.price) FROM cars
+                WHERE cars.manufacturer_id = OLD.manufacturer_id
+                AND cars.color = OLD.color
+            ), price_min) END,
+        price_max = CASE WHEN OLD.price < price_max THEN price_max
+            ELSE coalesce((
+                SELECT max(cars.price) FROM cars
+                WHERE cars.manufacturer_id = OLD.manufacturer_id
+                AND cars.color = OLD.color
+            ), price_max) END
+    WHERE manufacturer_id = OLD.manufacturer_id AND color = OLD.color;
+
+    DELETE FROM car_price_stats
+    WHERE manufacturer_id = OLD.manufacturer_id AND color = OLD.color
+    AND cars <= 0;
+'''
+
+SQLITE_STATS_DDL = (
+    f'''
+    CREATE TRIGGER IF NOT EXISTS cars_price_stats_insert AFTER INSERT ON cars
+    BEGIN {SQLITE_STATS_ADD} END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS cars_price_stats_update
+    AFTER UPDATE OF manufacturer_id, color, price ON cars
+    BEGIN {SQLITE_STATS_REMOVE} {SQLITE_STATS_ADD} END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS cars_price_stats_delete AFTER DELETE ON cars
+    BEGIN {SQLITE_STATS_REMOVE} END
+    ''',
+)
+
+for dialect, statements in (
+    ('postgresql', POSTGRESQL_STATS_DDL),
+    ('sqlite', SQLITE_STATS_DDL),
+):
+    for statement in statements:
+        event.listen(
+            SQLModel.metadata,
+            'after_create',
+            DDL(statement).execute_if(dialect=dialect)
+        )
+
+
+STATS_COLUMNS = (
+    func.sum(CarPriceStats.cars).label('cars'),
+    func.min(CarPriceStats.price_min).label('min_price'),
+    func.sum(CarPriceStats.price_total).label('price_total'),
+    func.max(CarPriceStats.price_max).label('max_price'),
+)
+
+
+def price_stats(row: Row) -> dict:
+    '''Public statistics from summed summary rows'''
+    return {
+        'cars': row.cars,
+        'min_price': row.min_price,
+        'avg_price': (Decimal(row.price_total) / row.cars).quantize(CENT),
+        'max_price': row.max_price,
+    }
+
+
+def merge_price_stats(rows: Iterable[Row]) -> dict | None:
+    '''Statistics over several groups of summary rows'''
+    rows = list(rows)
+    if not rows:
+        return None
+
+    cars = sum(row.cars for row in rows)
+    return {
+        'cars': cars,
+        'min_price': min(row.min_price for row in rows),
+        'avg_price': (
+            sum(Decimal(row.price_total) for row in rows) / cars
+        ).quantize(CENT),
+        'max_price': max(row.max_price for row in rows),
+    }
+
+
+async def car_stats(session: AsyncSession) -> dict:
+    '''Price statistics of all cars by manufacturer and by color'''
+    by_manufacturer = await session.execute(
+        select(
+            CarPriceStats.manufacturer_id,
+            Manufacturer.name.label('manufacturer_name'),
+            *STATS_COLUMNS
+        )
+        .join(Manufacturer, Manufacturer.id == CarPriceStats.manufacturer_id)
+        .group_by(CarPriceStats.manufacturer_id, Manufacturer.name)
+        .order_by(CarPriceStats.manufacturer_id)
+    )
+    by_color = await session.execute(
+        select(CarPriceStats.color, *STATS_COLUMNS)
+        .group_by(CarPriceStats.color)
+        .order_by(CarPriceStats.color)
+    )
+
+    return {
+        'by_manufacturer': [
+            {
+                'manufacturer_id': row.manufacturer_id,
+                'manufacturer_name': row.manufacturer_name,
+                **price_stats(row)
+            }
+            for row in by_manufacturer
+        ],
+        'by_color': [
+            {'color': row.color, **price_stats(row)} for row in by_color
+        ],
+    }
+
+
+async def manufacturer_stats(
+    session: AsyncSession,
+    manufacturer_id: int
+) -> dict:
+    '''Price statistics of cars of manufacturer, overall and by color'''
+    result = await session.execute(
+        select(
+            CarPriceStats.color,
+            CarPriceStats.cars,
+            CarPriceStats.price_min.label('min_price'),
+            CarPriceStats.price_total,
+            CarPriceStats.price_max.label('max_price')
+        )
+        .where(CarPriceStats.manufacturer_id == manufacturer_id)
+        .order_by(CarPriceStats.color)
+    )
+    rows = list(result.all())
+
+    return {
+        'manufacturer_id': manufacturer_id,
+        'total': merge_price_stats(rows),
+        'by_color': [
+            {'color': row.color, **price_stats(row)} for row in rows
+        ],
+    }
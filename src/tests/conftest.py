@@ -1,17 +1,25 @@
 '''Configuration for test module'''
 # pylint: disable=redefined-outer-name
 import asyncio
+import os
+import pytest
 import pytest_asyncio
 from sqlmodel import SQLModel
 from sqlalchemy.ext.asyncio import create_async_engine, \
                                 AsyncSession, async_sessionmaker
 from sqlalchemy.pool import StaticPool
 from httpx import AsyncClient, ASGITransport
+from ..cache import facet_cache, manufacturer_ids, repeats, \
+                    response_cache
 from ..main import app
-from ..database import get_async_session
+from ..metrics import registry
+from ..database import get_async_session, get_read_session
 
 
 TEST_DATABASE_URL = "sqlite+aiosqlite:///:memory:"
+# throwaway PostgreSQL database for tests of concurrent writes, SQLite
+# serializes writers and never runs the ON CONFLICT paths they check
+RACE_TEST_DATABASE_URL = os.getenv('RACE_TEST_DATABASE_URL')
 
 
 @pytest_asyncio.fixture(scope="session")
@@ -22,6 +30,18 @@ async def event_loop():
     loop.close()
 
 
+@pytest_asyncio.fixture(scope="function", autouse=True)
+async def clear_caches():
+    '''Reset per-process caches between tests'''
+    yield
+    for task in repeats:
+        task.cancel()
+    manufacturer_ids.clear()
+    facet_cache.clear()
+    registry.clear()
+    await response_cache.clear()
+
+
 @pytest_asyncio.fixture(scope="function")
 async def test_engine():
     '''In-memory SQLite engine with automatic table setup/teardown.'''
@@ -65,6 +85,46 @@ async def client(test_session):
         yield test_session
 
     app.dependency_overrides[get_async_session] = override_get_async_session
+    app.dependency_overrides[get_read_session] = override_get_async_session
+
+    async with AsyncClient(
+        transport=ASGITransport(app=app),
+        base_url="http://test"
+    ) as ac:
+        yield ac
+
+    app.dependency_overrides.clear()
+
+
+@pytest_asyncio.fixture(scope="function")
+async def concurrent_client():
+    '''Async HTTP client with a session per request on PostgreSQL'''
+    if not RACE_TEST_DATABASE_URL:
+        pytest.skip('RACE_TEST_DATABASE_URL is not set')
+
+    engine = create_async_engine(
+        RACE_TEST_DATABASE_URL,
+        pool_size=20,
+        pool_timeout=60
+    )
+
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.drop_all)
+        await conn.run_sync(SQLModel.metadata.create_all)
+
+    session_maker = async_sessionmaker(
+        engine,
+        class_=AsyncSession,
+        expire_on_commit=False,
+        autoflush=False
+    )
+
+    async def override_get_async_session():
+        async with session_maker() as session:
+            yield session
+
+    app.dependency_overrides[get_async_session] = override_get_async_session
+    app.dependency_overrides[get_read_session] = override_get_async_session
 
     async with AsyncClient(
         transport=ASGITransport(app=app),
@@ -73,3 +133,6 @@ async def client(test_session):
         yield ac
 
     app.dependency_overrides.clear()
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.drop_all)
+    await engine.dispose()
@@ -0,0 +1,283 @@
+'''Module for testing caches'''
+import asyncio
+import pytest
+from fakeredis import FakeAsyncRedis
+from httpx import AsyncClient
+from redis.exceptions import ConnectionError as RedisConnectionError
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
+from .. import cache
+from ..cache import LRUCache, MemoryBackend, RedisBackend, car_key, \
+                    manufacturer_ids, response_cache
+from ..models import Manufacturer
+
+
+class TestLRUCache:
+    '''Test in-process LRU cache'''
+    def test_hits_and_misses(self):
+        '''Test counters follow lookups'''
+        cache = LRUCache(maxsize=2, ttl=60)
+        assert cache.get('a') is None
+        cache.set('a', 1)
+        assert cache.get('a') == 1
+        assert cache.stats()['hits'] == 1
+        assert cache.stats()['misses'] == 1
+
+    def test_evicts_least_recently_used(self):
+        '''Test bound on size'''
+        cache = LRUCache(maxsize=2, ttl=60)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+        assert cache.get('b') is None
+        assert cache.get('a') == 1
+        assert cache.get('c') == 3
+
+    def test_expires_entries(self):
+        '''Test entries older than ttl are dropped'''
+        cache = LRUCache(maxsize=2, ttl=-1)
+        cache.set('a', 1)
+        assert cache.get('a') is None
+        assert cache.stats()['size'] == 0
+
+
+class TestManufacturerIdCache:
+    '''Test manufacturer name to id cache usage by routers'''
+    @pytest.mark.asyncio
+    async def test_create_car_uses_cache(self, client: AsyncClient):
+        '''Test second car of manufacturer resolves id from cache'''
+        car = {
+            'name': 'camry', 'color': 'red',
+            'price': '100.00', 'manufacturer_name': 'Toyota'
+        }
+        await client.post('/manufacturers', json={'name': 'toyota'})
+        first = await client.post('/cars', json=car)
+        second = await client.post('/cars', json=car)
+        assert manufacturer_ids.hits == 1
+        assert first.json()['manufacturer_id'] == \
+            second.json()['manufacturer_id']
+
+    @pytest.mark.asyncio
+    async def test_rename_invalidates_cache(self, client: AsyncClient):
+        '''Test renamed manufacturer is not found by old name'''
+        car = {
+            'name': 'camry', 'color': 'red',
+            'price': '100.00', 'manufacturer_name': 'toyota'
+        }
+        first = (await client.post('/cars', json=car)).json()
+        await client.post('/cars', json=car)
+        await client.put(
+            f"/manufacturers/{first['manufacturer_id']}",
+            json={'name': 'lexus'}
+        )
+
+        third = (await client.post('/cars', json=car)).json()
+        assert third['manufacturer_id'] != first['manufacturer_id']
+        assert third['manufacturer_name'] == 'toyota'
+
+    @staticmethod
+    async def rename_behind_cache(
+        session: AsyncSession,
+        manufacturer_id: int,
+        name: str
+    ) -> None:
+        '''Rename manufacturer the way another worker or a script would'''
+        await session.execute(
+            update(Manufacturer)
+            .where(Manufacturer.id == manufacturer_id)
+            .values(name=name)
+        )
+        await session.commit()
+
+    @pytest.mark.asyncio
+    async def test_create_car_after_rename_behind_cache(
+        self,
+        client: AsyncClient,
+        test_session: AsyncSession
+    ):
+        '''Test cached id of a name it no longer has is not used'''
+        car = {
+            'name': 'xc90', 'color': 'red',
+            'price': '100.00', 'manufacturer_name': 'volvo'
+        }
+        first = (await client.post('/cars', json=car)).json()
+        await self.rename_behind_cache(
+            test_session, first['manufacturer_id'], 'saab'
+        )
+        assert manufacturer_ids.get('volvo') == first['manufacturer_id']
+
+        second = (await client.post('/cars', json=car)).json()
+        assert second['manufacturer_id'] != first['manufacturer_id']
+        response = await client.get(f"/cars/{second['id']}")
+        assert response.json()['manufacturer_name'] == 'volvo'
+        assert manufacturer_ids.get('volvo') == second['manufacturer_id']
+
+    @pytest.mark.asyncio
+    async def test_update_car_after_rename_behind_cache(
+        self,
+        client: AsyncClient,
+        test_session: AsyncSession
+    ):
+        '''Test update resolves a renamed manufacturer by its name'''
+        volvo = {
+            'name': 'xc90', 'color': 'red',
+            'price': '100.00', 'manufacturer_name': 'volvo'
+        }
+        first = (await client.post('/cars', json=volvo)).json()
+        other = (await client.post(
+            '/cars', json={**volvo, 'manufacturer_name': 'audi'}
+        )).json()
+        await self.rename_behind_cache(
+            test_session, first['manufacturer_id'], 'saab'
+        )
+
+        moved = (await client.put(
+            f"/cars/{other['id']}", json={'manufacturer_name': 'volvo'}
+        )).json()
+        assert moved['manufacturer_id'] != first['manufacturer_id']
+        response = await client.get(f"/cars/{other['id']}")
+        assert response.json()['manufacturer_name'] == 'volvo'
+
+
+@pytest.fixture(params=['memory', 'redis'])
+def backend(request):
+    '''Each response cache backend, redis one against a stand-in'''
+    if request.param == 'redis':
+        return RedisBackend(
+            'redis://stand-in', ttl=60, client=FakeAsyncRedis()
+        )
+    return MemoryBackend(maxsize=10, ttl=60)
+
+
+class TestResponseCacheBackends:
+    '''Test response cache backends share behavior'''
+    @pytest.mark.asyncio
+    async def test_get_set_delete(self, backend):
+        '''Test basic cycle'''
+        assert await backend.get('car:1') is None
+        await backend.set('car:1', b'{}')
+        assert await backend.get('car:1') == b'{}'
+        await backend.delete('car:1')
+        assert await backend.get('car:1') is None
+
+    @pytest.mark.asyncio
+    async def test_invalidate_tag(self, backend):
+        '''Test tag drops only keys stored with it'''
+        await backend.set('car:1', b'1', tags=['manufacturer:1:cars'])
+        await backend.set('car:2', b'2', tags=['manufacturer:1:cars'])
+        await backend.set('car:3', b'3', tags=['manufacturer:2:cars'])
+        await backend.invalidate_tag('manufacturer:1:cars')
+        assert await backend.get('car:1') is None
+        assert await backend.get('car:2') is None
+        assert await backend.get('car:3') == b'3'
+
+    @pytest.mark.asyncio
+    async def test_redis_errors_are_misses(self):
+        '''Test unavailable server does not break reads'''
+        class BrokenRedis:
+            '''Client failing every call'''
+            async def get(self, key):
+                '''Fail'''
+                raise RedisConnectionError(key)
+
+        backend = RedisBackend(
+            'redis://stand-in', ttl=60, client=BrokenRedis()
+        )
+        assert await backend.get('car:1') is None
+
+
+class TestResponseCache:
+    '''Test read-through caching of detail endpoints'''
+    @pytest.mark.asyncio
+    async def test_read_car_cached(self, client: AsyncClient):
+        '''Test cached body is identical and served from cache'''
+        car = {
+            'name': 'camry', 'color': 'red',
+            'price': '100.00', 'manufacturer_name': 'toyota'
+        }
+        car_id = (await client.post('/cars', json=car)).json()['id']
+        first = await client.get(f'/cars/{car_id}')
+        second = await client.get(f'/cars/{car_id}')
+        assert first.content == second.content
+        assert response_cache.entries.hits == 1
+
+    @pytest.mark.asyncio
+    async def test_stale_fill_is_dropped_again(
+        self,
+        client: AsyncClient,
+        monkeypatch
+    ):
+        '''Test body stored by a read that lagged behind a write expires'''
+        monkeypatch.setattr(cache, 'MIN_REPEAT_DELAY', 0)
+        car = {
+            'name': 'camry', 'color': 'red',
+            'price': '100.00', 'manufacturer_name': 'toyota'
+        }
+        car_id = (await client.post('/cars', json=car)).json()['id']
+        old = await client.get(f'/cars/{car_id}')
+
+        await client.put(f'/cars/{car_id}', json={'color': 'blue'})
+        # a lagging replica fills the cache right after the write
+        await response_cache.set(car_key(car_id), old.content)
+        await asyncio.gather(*cache.repeats)
+
+        response = await client.get(f'/cars/{car_id}')
+        assert response.json()['color'] == 'blue'
+
+    @pytest.mark.asyncio
+    async def test_car_update_keeps_other_cars_cached(
+        self,
+        client: AsyncClient
+    ):
+        '''Test write drops only the entry of the written car'''
+        car = {
+            'name': 'camry', 'color': 'red',
+            'price': '100.00', 'manufacturer_name': 'toyota'
+        }
+        first = (await client.post('/cars', json=car)).json()['id']
+        second = (await client.post('/cars', json=car)).json()['id']
+        await client.get(f'/cars/{second}')
+
+        await client.put(f'/cars/{first}', json={'price': '200.00'})
+        await client.get(f'/cars/{second}')
+        assert response_cache.entries.hits == 1
+
+    @pytest.mark.asyncio
+    async def test_car_update_invalidates(self, client: AsyncClient):
+        '''Test updated car is not served stale'''
+        car = {
+            'name': 'camry', 'color': 'red',
+            'price': '100.00', 'manufacturer_name': 'toyota'
+        }
+        car_id = (await client.post('/cars', json=car)).json()['id']
+        await client.get(f'/cars/{car_id}')
+        await client.put(f'/cars/{car_id}', json={'color': 'blue'})
+        response = await client.get(f'/cars/{car_id}')
+        assert response.json()['color'] == 'blue'
+
+    @pytest.mark.asyncio
+    async def test_manufacturer_rename_invalidates_cars(
+        self,
+        client: AsyncClient
+    ):
+        '''Test rename refreshes manufacturer and cars embedding it'''
+        car = {
+            'name': 'camry', 'color': 'red',
+            'price': '100.00', 'manufacturer_name': 'toyota'
+        }
+        created = (await client.post('/cars', json=car)).json()
+        manufacturer_id = created['manufacturer_id']
+        await client.get(f"/cars/{created['id']}")
+        await client.get(f'/manufacturers/{manufacturer_id}')
+
+        await client.put(
+            f'/manufacturers/{manufacturer_id}',
+            json={'name': 'lexus'}
+        )
+        car_response = await client.get(f"/cars/{created['id']}")
+        manufacturer_response = await client.get(
+            f'/manufacturers/{manufacturer_id}'
+        )
+        assert car_response.json()['manufacturer_name'] == 'lexus'
+        assert manufacturer_response.json()['name'] == 'lexus'
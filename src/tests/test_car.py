@@ -1,8 +1,18 @@
 '''Modyle for testing car endpoints'''
 # # pylint: disable=redefined-outer-name
+import asyncio
+import csv
+import io
+import json
+from decimal import Decimal
+from types import SimpleNamespace
 from typing import TypedDict
 import pytest
 from httpx import AsyncClient
+from sqlalchemy.dialects import postgresql
+from ..models import CarCreate
+from ..queries import insert_car
+from ..settings import settings
 
 
 class CarDict(TypedDict):
@@ -112,6 +122,72 @@ class TestCarCreate:
         assert get_response.status_code == 200
         assert get_data['name'] == sample_car['manufacturer_name']
 
+    @pytest.mark.asyncio
+    async def test_create_cars_concurrently_with_new_manufacturer(
+        self,
+        concurrent_client: AsyncClient,
+        sample_car: CarDict
+    ):
+        '''Test parallel creates racing to add the same manufacturer
+
+        Runs on PostgreSQL from RACE_TEST_DATABASE_URL only.
+        '''
+        responses = await asyncio.gather(*(
+            concurrent_client.post(
+                '/cars',
+                json={**sample_car, 'name': f'car-{index}'}
+            )
+            for index in range(200)
+        ))
+
+        assert {response.status_code for response in responses} == {201}
+        assert len({
+            response.json()['manufacturer_id'] for response in responses
+        }) == 1
+        manufacturers = await concurrent_client.get('/manufacturers')
+        assert len(manufacturers.json()['items']) == 1
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize(('manufacturer_id', 'resolved'), [
+        (None, 'ON CONFLICT (name) DO UPDATE SET name = excluded.name'),
+        (7, 'WHERE manufacturers.id = %(id_1)s '
+            'AND manufacturers.name = %(name_1)s'),
+    ])
+    async def test_create_car_is_one_statement_on_postgresql(
+        self,
+        manufacturer_id,
+        resolved
+    ):
+        '''Test manufacturer is resolved inside the car INSERT
+
+        Concurrent creates of a new manufacturer then rely on ON CONFLICT
+        rather than on a lookup racing with other inserts, and a cached
+        id is only used while it still has the name.
+        '''
+        executed = []
+
+        async def execute(statement):
+            executed.append(statement)
+            return SimpleNamespace(first=lambda: None)
+
+        session = SimpleNamespace(
+            bind=SimpleNamespace(dialect=postgresql.dialect()),
+            execute=execute
+        )
+        new_car = CarCreate(
+            name='camry', color='red',
+            price=Decimal('100.00'), manufacturer_name='Toyota'
+        )
+
+        await insert_car(session, new_car, manufacturer_id)
+
+        assert len(executed) == 1
+        compiled = executed[0].compile(dialect=postgresql.dialect())
+        assert 'INSERT INTO cars' in str(compiled)
+        assert resolved in str(compiled)
+        assert 'INSERT INTO catalog_versions' in str(compiled)
+        assert 'toyota' in compiled.params.values()
+
     @pytest.mark.asyncio
     async def test_create_car_invalid_name(self, client: AsyncClient):
         '''Test car creation with name out of regex pattern'''
@@ -136,6 +212,182 @@ class TestCarCreate:
         response = await client.post('/cars', json=car_data)
         assert response.status_code == 422
 
+    @pytest.mark.asyncio
+    async def test_create_car_cyrillic_lowercase(self, client: AsyncClient):
+        '''Test non-ASCII names are lowercased and found by filters'''
+        car_data = {
+            'name': 'ЖИГУЛИ',
+            'color': 'КРАСНЫЙ',
+            'price': '1000.00',
+            'manufacturer_name': 'ВАЗ'
+        }
+        response = await client.post('/cars', json=car_data)
+        data = response.json()
+        assert response.status_code == 201
+        assert data['name'] == 'жигули'
+        assert data['color'] == 'красный'
+        assert data['manufacturer_name'] == 'ваз'
+
+        response = await client.get(
+            '/cars', params={'name': 'Жигули', 'color': 'КРАСНЫЙ'}
+        )
+        assert [car['id'] for car in response.json()['items']] == \
+            [data['id']]
+
+
+class TestCarBulkCreate:
+    '''Test bulk car creation'''
+    @pytest.mark.asyncio
+    async def test_bulk_create_cars(
+        self,
+        client: AsyncClient,
+        sample_car: CarDict,
+        sample_car2: CarDict
+    ):
+        '''Test bulk creation shares and creates manufacturers'''
+        await client.post('/manufacturers', json={'name': 'existing'})
+        cars = [
+            sample_car,
+            {**sample_car2, 'manufacturer_name': 'EXISTING'},
+            {**sample_car2, 'name': 'Other', 'manufacturer_name': 'existing'}
+        ]
+        response = await client.post('/cars/bulk', json=cars)
+        data = response.json()
+        assert response.status_code == 200
+        assert data['created'] == 3
+        assert data['failed'] == 0
+        assert [item['index'] for item in data['items']] == [0, 1, 2]
+        created = [item['car'] for item in data['items']]
+        assert created[0]['manufacturer_name'] == 'test-manufacturer'
+        assert created[1]['manufacturer_id'] == created[2]['manufacturer_id']
+        assert created[2]['name'] == 'other'
+
+        get_response = await client.get(f"/cars/{created[2]['id']}")
+        assert get_response.json() == created[2]
+
+        manufacturers = await client.get('/manufacturers')
+        assert len(manufacturers.json()['items']) == 2
+
+    @pytest.mark.asyncio
+    async def test_bulk_create_reports_invalid_items(
+        self,
+        client: AsyncClient,
+        sample_car: CarDict
+    ):
+        '''Test invalid items are reported by index'''
+        cars = [
+            {**sample_car, 'color': 'red123'},
+            sample_car,
+            {**sample_car, 'price': '-1'}
+        ]
+        response = await client.post('/cars/bulk', json=cars)
+        data = response.json()
+        assert response.status_code == 200
+        assert data['created'] == 1
+        assert data['failed'] == 2
+        assert data['items'][0]['car'] is None
+        assert data['items'][0]['errors'][0].startswith('color')
+        assert data['items'][1]['car']['name'] == sample_car['name']
+        assert data['items'][1]['errors'] == []
+        assert data['items'][2]['errors'][0].startswith('price')
+
+    @pytest.mark.asyncio
+    async def test_bulk_create_reports_non_object_items(
+        self,
+        client: AsyncClient,
+        sample_car: CarDict
+    ):
+        '''Test items that are not objects fail alone'''
+        response = await client.post(
+            '/cars/bulk', json=[sample_car, 5, None, [sample_car]]
+        )
+        data = response.json()
+        assert response.status_code == 200
+        assert data['created'] == 1
+        assert data['failed'] == 3
+        assert data['items'][0]['car']['name'] == sample_car['name']
+        assert [item['errors'] for item in data['items'][1:]] == [
+            ['item: Input should be an object']
+        ] * 3
+
+
+class TestCarImport:
+    '''Test CSV import of cars'''
+    @pytest.mark.asyncio
+    async def test_import_cars(self, client: AsyncClient):
+        '''Test import normalizes rows and reports invalid ones'''
+        await client.post('/manufacturers', json={'name': 'toyota'})
+        body = (
+            'manufacturer_name,name,color,price\r\n'
+            'Toyota,Camry,White,25000.50\r\n'
+            'mazda,rx-7,red,-1\r\n'
+            'MAZDA,RX-8,Red,30000\r\n'
+            '\r\n'
+            'volvo,xc90\r\n'
+        )
+        response = await client.post(
+            '/cars/import',
+            content=body.encode(),
+            headers={'Content-Type': 'text/csv'}
+        )
+        data = response.json()
+        assert response.status_code == 200
+        assert data['rows'] == 4
+        assert data['created'] == 2
+        assert data['rejected'] == 2
+        assert data['errors'] == [
+            'line 3: invalid price',
+            'line 6: expected 4 columns'
+        ]
+
+        cars = (await client.get('/cars')).json()['items']
+        assert [
+            (car['name'], car['color'], car['price'], car['manufacturer_name'])
+            for car in cars
+        ] == [
+            ('camry', 'white', '25000.50', 'toyota'),
+            ('rx-8', 'red', '30000.00', 'mazda')
+        ]
+        manufacturers = (await client.get('/manufacturers')).json()['items']
+        assert len(manufacturers) == 2
+
+    @pytest.mark.asyncio
+    async def test_import_cars_cyrillic(self, client: AsyncClient):
+        '''Test import lowercases non-ASCII names like other writes'''
+        await client.post('/manufacturers', json={'name': 'лада'})
+        body = (
+            'name,color,price,manufacturer_name\n'
+            'КАМРИ,КРАСНЫЙ,10.00,ТОЙОТА\n'
+            'Веста,Белый,20.00,ЛАДА\n'
+        )
+        response = await client.post(
+            '/cars/import',
+            content=body.encode(),
+            headers={'Content-Type': 'text/csv'}
+        )
+        assert response.json()['created'] == 2
+
+        cars = (await client.get(
+            '/cars', params={'manufacturer': 'тойота'}
+        )).json()['items']
+        assert [(car['name'], car['color']) for car in cars] == [
+            ('камри', 'красный')
+        ]
+        manufacturers = (await client.get('/manufacturers')).json()['items']
+        assert sorted(item['name'] for item in manufacturers) == [
+            'лада', 'тойота'
+        ]
+
+    @pytest.mark.asyncio
+    async def test_import_cars_invalid_header(self, client: AsyncClient):
+        '''Test import rejects unexpected columns'''
+        response = await client.post(
+            '/cars/import',
+            content=b'name,colour,price,manufacturer_name\n',
+            headers={'Content-Type': 'text/csv'}
+        )
+        assert response.status_code == 400
+
 
 class TestCarRead:
     '''Test car information retrive operations'''
@@ -179,7 +431,7 @@ class TestCarRead:
         data = response.json()
         print(f"All cars: {data}")
         assert response.status_code == 200
-        assert len(data) == 2
+        assert len(data['items']) == 2
 
     @pytest.mark.asyncio
     async def test_get_cars_filter_by_name(
@@ -195,8 +447,8 @@ class TestCarRead:
         response = await client.get('/cars', params={'name': 'test-car'})
         data = response.json()
         assert response.status_code == 200
-        assert len(data) == 1
-        assert data[0]['name'] == 'test-car'
+        assert len(data['items']) == 1
+        assert data['items'][0]['name'] == 'test-car'
 
     @pytest.mark.asyncio
     async def test_get_cars_filter_by_color(
@@ -212,8 +464,8 @@ class TestCarRead:
         response = await client.get('/cars', params={'color': 'blue'})
         data = response.json()
         assert response.status_code == 200
-        assert len(data) == 1
-        assert data[0]['color'] == 'blue'
+        assert len(data['items']) == 1
+        assert data['items'][0]['color'] == 'blue'
 
     @pytest.mark.asyncio
     async def test_get_cars_filter_by_manufacturer(
@@ -232,8 +484,8 @@ class TestCarRead:
         )
         data = response.json()
         assert response.status_code == 200
-        assert len(data) == 1
-        assert data[0]['manufacturer_name'] == 'test-manufacturer'
+        assert len(data['items']) == 1
+        assert data['items'][0]['manufacturer_name'] == 'test-manufacturer'
 
     @pytest.mark.asyncio
     async def test_get_cars_multiple_filters(
@@ -251,10 +503,317 @@ class TestCarRead:
         })
         data = response.json()
         assert response.status_code == 200
-        assert len(data) == 1
-        assert data[0]['name'] == 'test-car'
-        assert data[0]['color'] == 'red'
-        assert data[0]['manufacturer_name'] == 'test-manufacturer'
+        assert len(data['items']) == 1
+        assert data['items'][0]['name'] == 'test-car'
+        assert data['items'][0]['color'] == 'red'
+        assert data['items'][0]['manufacturer_name'] == 'test-manufacturer'
+
+    @pytest.mark.asyncio
+    async def test_get_cars_pagination(
+        self,
+        client: AsyncClient,
+        sample_car: CarDict
+    ):
+        '''Test walking through pages with cursor'''
+        for price in ('5000.00', '1000.00', '3000.00'):
+            await client.post('/cars', json={**sample_car, 'price': price})
+
+        first = await client.get('/cars', params={'limit': 2})
+        first_data = first.json()
+        assert first.status_code == 200
+        assert [car['id'] for car in first_data['items']] == [1, 2]
+        assert first_data['next_cursor'] is not None
+
+        second = await client.get('/cars', params={
+            'limit': 2,
+            'cursor': first_data['next_cursor']
+        })
+        second_data = second.json()
+        assert [car['id'] for car in second_data['items']] == [3]
+        assert second_data['next_cursor'] is None
+
+    @pytest.mark.asyncio
+    async def test_get_cars_pagination_sorted_by_price(
+        self,
+        client: AsyncClient,
+        sample_car: CarDict
+    ):
+        '''Test keyset pagination ordered by price'''
+        for price in ('5000.00', '1000.00', '3000.00', '1000.00'):
+            await client.post('/cars', json={**sample_car, 'price': price})
+
+        prices, cursor = [], None
+        while True:
+            params = {'sort': 'price', 'limit': 1}
+            if cursor:
+                params['cursor'] = cursor
+            response = await client.get('/cars', params=params)
+            data = response.json()
+            prices += [car['price'] for car in data['items']]
+            cursor = data['next_cursor']
+            if cursor is None:
+                break
+
+        assert prices == ['1000.00', '1000.00', '3000.00', '5000.00']
+
+    @pytest.mark.asyncio
+    async def test_get_cars_pagination_sorted_by_price_descending(
+        self,
+        client: AsyncClient,
+        sample_car: CarDict
+    ):
+        '''Test keyset pagination ordered by price from the top'''
+        for price in ('5000.00', '1000.00', '3000.00', '1000.00'):
+            await client.post('/cars', json={**sample_car, 'price': price})
+
+        cars, cursor = [], None
+        while True:
+            params = {'sort': '-price', 'limit': 1}
+            if cursor:
+                params['cursor'] = cursor
+            response = await client.get('/cars', params=params)
+            data = response.json()
+            cars += [(car['price'], car['id']) for car in data['items']]
+            cursor = data['next_cursor']
+            if cursor is None:
+                break
+
+        assert cars == [
+            ('5000.00', 1), ('3000.00', 3), ('1000.00', 4), ('1000.00', 2)
+        ]
+
+    @pytest.mark.asyncio
+    async def test_get_cars_sorted_by_name(
+        self,
+        client: AsyncClient,
+        sample_car: CarDict
+    ):
+        '''Test ordering by name'''
+        for name in ('corolla', 'astra', 'bora'):
+            await client.post('/cars', json={**sample_car, 'name': name})
+
+        first = await client.get('/cars', params={'sort': 'name', 'limit': 2})
+        first_data = first.json()
+        second = await client.get('/cars', params={
+            'sort': 'name',
+            'limit': 2,
+            'cursor': first_data['next_cursor']
+        })
+        names = [
+            car['name']
+            for car in first_data['items'] + second.json()['items']
+        ]
+        assert names == ['astra', 'bora', 'corolla']
+
+    @pytest.mark.asyncio
+    async def test_get_cars_filter_by_price_range(
+        self,
+        client: AsyncClient,
+        sample_car: CarDict,
+        sample_car2: CarDict
+    ):
+        '''Test price band filter combined with manufacturer'''
+        for price in ('999.99', '1000.00', '2500.50', '5000.00', '5000.01'):
+            await client.post('/cars', json={**sample_car, 'price': price})
+        await client.post('/cars', json={**sample_car2, 'price': '2000.00'})
+
+        response = await client.get('/cars', params={
+            'min_price': '1000',
+            'max_price': '5000',
+            'manufacturer': sample_car['manufacturer_name'],
+            'sort': '-price'
+        })
+        prices = [car['price'] for car in response.json()['items']]
+        assert response.status_code == 200
+        assert prices == ['5000.00', '2500.50', '1000.00']
+
+    @pytest.mark.asyncio
+    async def test_get_cars_invalid_price_filter(self, client: AsyncClient):
+        '''Test rejecting negative price bound'''
+        response = await client.get('/cars', params={'min_price': '-1'})
+        assert response.status_code == 422
+
+    @pytest.mark.asyncio
+    async def test_get_cars_invalid_cursor(self, client: AsyncClient):
+        '''Test rejecting malformed cursor'''
+        response = await client.get('/cars', params={'cursor': 'garbage'})
+        assert response.status_code == 400
+        assert response.json()['detail'] == 'Invalid cursor'
+
+    @pytest.mark.asyncio
+    async def test_get_cars_fast_serialization(
+        self,
+        client: AsyncClient,
+        sample_car: CarDict,
+        monkeypatch: pytest.MonkeyPatch
+    ):
+        '''Test fast path gives the same bytes as pydantic path'''
+        await client.post('/cars', json=sample_car)
+        await client.post('/cars', json={
+            **sample_car, 'name': 'жигули', 'price': '1.50'
+        })
+        await client.post('/cars', json={**sample_car, 'price': '7'})
+        params = {'limit': 2, 'sort': 'price'}
+
+        slow = await client.get('/cars', params=params)
+        monkeypatch.setattr(settings, 'FAST_SERIALIZATION', True)
+        fast = await client.get('/cars', params=params)
+
+        assert fast.status_code == 200
+        assert fast.content == slow.content
+        assert fast.headers['content-type'] == slow.headers['content-type']
+        assert fast.headers['etag'] == slow.headers['etag']
+
+
+class TestCarSearch:
+    '''Tests for car search'''
+    @pytest.mark.asyncio
+    async def test_search_cars(
+        self,
+        client: AsyncClient,
+        sample_car: CarDict
+    ):
+        '''Test prefix matches are ranked first'''
+        for name in ('land-cruiser', 'cruiser', 'camry', 'cruze'):
+            await client.post('/cars', json={**sample_car, 'name': name})
+
+        response = await client.get('/cars/search', params={'q': 'CRUISER'})
+        data = response.json()
+        assert response.status_code == 200
+        assert [car['name'] for car in data] == ['cruiser', 'land-cruiser']
+        assert data[0]['manufacturer_name'] == sample_car['manufacturer_name']
+
+    @pytest.mark.asyncio
+    async def test_search_cars_escapes_wildcards(
+        self,
+        client: AsyncClient,
+        sample_car: CarDict
+    ):
+        '''Test LIKE wildcards in query are matched literally'''
+        await client.post('/cars', json=sample_car)
+
+        response = await client.get('/cars/search', params={'q': '%'})
+        assert response.status_code == 200
+        assert response.json() == []
+
+    @pytest.mark.asyncio
+    async def test_search_cars_requires_query(self, client: AsyncClient):
+        '''Test rejecting empty query'''
+        response = await client.get('/cars/search', params={'q': ''})
+        assert response.status_code == 422
+
+
+class TestCarFacets:
+    '''Tests for faceted counts'''
+    @pytest.mark.asyncio
+    async def test_facets(
+        self,
+        client: AsyncClient,
+        sample_car: CarDict,
+        sample_car2: CarDict
+    ):
+        '''Test counts by every facet under filters'''
+        for car in (
+            {**sample_car, 'price': '1000.00'},
+            {**sample_car, 'price': '7000.00', 'color': 'blue'},
+            {**sample_car, 'price': '300000.00'},
+            {**sample_car2, 'price': '1000.00'},
+        ):
+            await client.post('/cars', json=car)
+
+        response = await client.get('/cars/facets')
+        data = response.json()
+        assert response.status_code == 200
+        assert data['colors'] == [
+            {'value': 'blue', 'count': 2},
+            {'value': 'red', 'count': 2}
+        ]
+        assert data['manufacturers'] == [
+            {'value': sample_car['manufacturer_name'], 'count': 3},
+            {'value': sample_car2['manufacturer_name'], 'count': 1}
+        ]
+        assert data['prices'] == [
+            {'min_price': '0', 'max_price': '5000', 'count': 2},
+            {'min_price': '5000', 'max_price': '10000', 'count': 1},
+            {'min_price': '250000', 'max_price': None, 'count': 1}
+        ]
+
+        response = await client.get('/cars/facets', params={
+            'color': 'RED', 'max_price': '5000'
+        })
+        data = response.json()
+        assert data['colors'] == [{'value': 'red', 'count': 1}]
+        assert [item['count'] for item in data['prices']] == [1]
+
+    @pytest.mark.asyncio
+    async def test_facets_follow_writes(
+        self,
+        client: AsyncClient,
+        sample_car: CarDict
+    ):
+        '''Test cached facets are not served after a write'''
+        await client.post('/cars', json=sample_car)
+        first = await client.get('/cars/facets')
+        cached = await client.get(
+            '/cars/facets',
+            headers={'If-None-Match': first.headers['etag']}
+        )
+        assert cached.status_code == 304
+
+        await client.post('/cars', json=sample_car)
+        response = await client.get('/cars/facets')
+        assert response.json()['colors'] == [{'value': 'red', 'count': 2}]
+
+
+class TestCarExport:
+    '''Test streaming export of cars'''
+    @pytest.mark.asyncio
+    async def test_export_ndjson(
+        self,
+        client: AsyncClient,
+        sample_car: CarDict,
+        sample_car2: CarDict
+    ):
+        '''Test NDJSON export matches regular representation'''
+        await client.post('/cars', json=sample_car)
+        await client.post('/cars', json=sample_car2)
+
+        page = await client.get('/cars')
+        response = await client.get(
+            '/cars',
+            headers={'Accept': 'application/x-ndjson'}
+        )
+        assert response.status_code == 200
+        assert response.headers['content-type'].startswith(
+            'application/x-ndjson'
+        )
+        lines = response.text.splitlines()
+        assert [json.loads(line) for line in lines] == page.json()['items']
+
+    @pytest.mark.asyncio
+    async def test_export_csv_with_filter(
+        self,
+        client: AsyncClient,
+        sample_car: CarDict,
+        sample_car2: CarDict
+    ):
+        '''Test CSV export honors filters'''
+        await client.post('/cars', json=sample_car)
+        await client.post('/cars', json=sample_car2)
+
+        response = await client.get(
+            '/cars',
+            params={'color': 'blue'},
+            headers={'Accept': 'text/csv'}
+        )
+        assert response.status_code == 200
+        rows = list(csv.DictReader(io.StringIO(response.text)))
+        assert len(rows) == 1
+        assert rows[0]['name'] == sample_car2['name']
+        assert rows[0]['price'] == sample_car2['price']
+        assert rows[0]['manufacturer_name'] == (
+            sample_car2['manufacturer_name']
+        )
 
 
 class TestCarUpdate:
@@ -278,6 +837,23 @@ class TestCarUpdate:
         assert data['color'] == 'green'
         assert data['price'] == '35000.00'
 
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize(
+        'field', ['name', 'color', 'price', 'manufacturer_name']
+    )
+    async def test_update_car_null_field(
+        self,
+        client: AsyncClient,
+        sample_car: CarDict,
+        field: str
+    ):
+        '''Test fields can be left out but not set to null'''
+        post_response = await client.post('/cars', json=sample_car)
+        car_id = post_response.json()['id']
+
+        response = await client.put(f'/cars/{car_id}', json={field: None})
+        assert response.status_code == 422
+
     @pytest.mark.asyncio
     async def test_update_car_manufacturer(
         self,
@@ -315,6 +891,60 @@ class TestCarUpdate:
         assert data['color'] == 'black'
         assert data['name'] == sample_car['name']
 
+    @pytest.mark.asyncio
+    async def test_update_car_uppercase_conversion(
+        self,
+        client: AsyncClient,
+        sample_car: CarDict
+    ):
+        '''Test update normalizes names like create'''
+        post_response = await client.post('/cars', json=sample_car)
+        car_id = post_response.json()['id']
+
+        update_data = {'name': 'NEW-CAR', 'manufacturer_name': 'OTHER'}
+        response = await client.put(f'/cars/{car_id}', json=update_data)
+        data = response.json()
+        assert response.status_code == 200
+        assert data['name'] == 'new-car'
+        assert data['manufacturer_name'] == 'other'
+
+        get_response = await client.get(f'/cars/{car_id}')
+        assert get_response.json() == data
+
+    @pytest.mark.asyncio
+    async def test_update_car_cyrillic_lowercase(
+        self,
+        client: AsyncClient,
+        sample_car: CarDict
+    ):
+        '''Test update lowercases non-ASCII names like create'''
+        post_response = await client.post('/cars', json=sample_car)
+        car_id = post_response.json()['id']
+
+        update_data = {'name': 'НИВА', 'color': 'БЕЛЫЙ'}
+        response = await client.put(f'/cars/{car_id}', json=update_data)
+        data = response.json()
+        assert response.status_code == 200
+        assert data['name'] == 'нива'
+        assert data['color'] == 'белый'
+
+        response = await client.get('/cars', params={'color': 'белый'})
+        assert [car['id'] for car in response.json()['items']] == [car_id]
+
+    @pytest.mark.asyncio
+    async def test_update_car_empty(
+        self,
+        client: AsyncClient,
+        sample_car: CarDict
+    ):
+        '''Test empty update returns car unchanged'''
+        post_response = await client.post('/cars', json=sample_car)
+        post_data = post_response.json()
+
+        response = await client.put(f'/cars/{post_data["id"]}', json={})
+        assert response.status_code == 200
+        assert response.json() == post_data
+
     @pytest.mark.asyncio
     async def test_update_car_not_found(self, client: AsyncClient):
         '''Test update not existing car'''
@@ -0,0 +1,229 @@
+'''Module for testing database setup'''
+# pylint: disable=redefined-outer-name
+import logging
+from types import SimpleNamespace
+import pytest
+import pytest_asyncio
+from httpx import AsyncClient, ASGITransport
+from sqlalchemy import exc, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, \
+                                    create_async_engine
+from sqlmodel import SQLModel
+from .. import database
+from ..database import InstrumentedPool, ReplicaSet, is_unique_violation
+from ..main import app
+from ..models import Manufacturer
+from ..settings import settings
+
+
+class TestInstrumentedPool:
+    '''Test pool statistics'''
+    @pytest.mark.asyncio
+    async def test_pool_stats(self, tmp_path):
+        '''Test checkouts, saturation and timeouts are recorded'''
+        engine = create_async_engine(
+            f'sqlite+aiosqlite:///{tmp_path / "pool.db"}',
+            poolclass=InstrumentedPool,
+            pool_size=1,
+            max_overflow=0,
+            pool_timeout=0.05
+        )
+
+        async with engine.connect() as connection:
+            await connection.execute(text('select 1'))
+            assert engine.pool.stats()['checked_out'] == 1
+
+            with pytest.raises(exc.TimeoutError):
+                async with engine.connect():
+                    pass
+
+        stats = engine.pool.stats()
+        await engine.dispose()
+        assert stats['checked_out'] == 0
+        assert stats['idle'] == 1
+        assert stats['checkouts'] == 2
+        assert stats['timeouts'] == 1
+        assert stats['wait_max_ms'] >= 50
+
+
+@pytest_asyncio.fixture
+async def engines(monkeypatch):
+    '''Engines of this process, restored afterwards'''
+    monkeypatch.setattr(database, 'async_engine', None)
+    monkeypatch.setattr(database.replicas, 'engines', [])
+    monkeypatch.setitem(database.async_session.kw, 'bind', None)
+
+    yield database
+
+    await database.close_engines()
+
+
+class TestLifespan:
+    '''Test engines created by the application lifespan'''
+    @pytest.mark.asyncio
+    async def test_pool_split_between_workers(self, engines, monkeypatch):
+        '''Test each worker gets its share of the pool'''
+        monkeypatch.setattr(settings, 'WARMUP', False)
+        monkeypatch.setattr(settings, 'WORKERS', 4)
+        monkeypatch.setattr(settings, 'POOL_SIZE', 20)
+        monkeypatch.setattr(settings, 'MAX_OVERFLOW', 10)
+
+        async with app.router.lifespan_context(app):
+            engine = engines.async_engine
+            assert engine.pool.stats()['size'] == 5
+            assert engine.pool.stats()['max_overflow'] == 2
+            assert engines.async_session.kw['bind'] is engine
+
+    def test_pool_of_single_worker(self, monkeypatch, caplog):
+        '''Test pool is never split below one connection, with a warning'''
+        monkeypatch.setattr(settings, 'POOL_SIZE', 2)
+        with caplog.at_level(logging.WARNING, logger='src.database'):
+            options = database.engine_options(
+                'sqlite+aiosqlite://', workers=4
+            )
+        assert options['pool_size'] == 1
+        assert 'POOL_SIZE 2 is less than 4 workers' in caplog.text
+
+        caplog.clear()
+        database.engine_options('sqlite+aiosqlite://', workers=2)
+        assert not caplog.text
+
+
+class TestIntegrityErrors:
+    '''Test telling unique violations from other integrity errors'''
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize(('name', 'unique'), [
+        ('toyota', True),
+        (None, False),
+    ])
+    async def test_is_unique_violation(
+        self,
+        test_session: AsyncSession,
+        name,
+        unique
+    ):
+        '''Test taken name is unique violation and null name is not'''
+        manufacturers = Manufacturer.__table__
+        await test_session.execute(
+            manufacturers.insert().values(name='toyota')
+        )
+
+        with pytest.raises(exc.IntegrityError) as error:
+            await test_session.execute(
+                manufacturers.insert().values(name=name)
+            )
+
+        assert is_unique_violation(error.value) is unique
+
+
+class TestDebugEndpoints:
+    '''Test internal debug endpoints'''
+    @pytest.mark.asyncio
+    async def test_pool_endpoint(self, client: AsyncClient, engines):
+        '''Test pool report shape'''
+        engines.open_engines()
+        response = await client.get('/debug/pool')
+        assert response.status_code == 200
+        assert {'size', 'checked_out', 'idle', 'overflow', 'wait_avg_ms'} \
+            <= response.json().keys()
+
+    @pytest.mark.asyncio
+    async def test_cache_endpoint(self, client: AsyncClient):
+        '''Test manufacturer cache counters report'''
+        response = await client.get('/debug/cache')
+        assert response.status_code == 200
+        assert response.json()['hits'] == 0
+
+
+def fake_engine(name: str, checked_out: int = 0):
+    '''Engine stand-in exposing pool checkouts'''
+    return SimpleNamespace(
+        name=name,
+        pool=SimpleNamespace(checkedout=lambda: checked_out)
+    )
+
+
+@pytest_asyncio.fixture
+async def replicated(tmp_path, monkeypatch):
+    '''Application wired to separate primary and replica SQLite files'''
+    engines = []
+    for name in ('primary', 'replica'):
+        engine = create_async_engine(
+            f'sqlite+aiosqlite:///{tmp_path / name}.db'
+        )
+        async with engine.begin() as connection:
+            await connection.run_sync(SQLModel.metadata.create_all)
+        engines.append(engine)
+
+    primary, replica = engines
+    monkeypatch.setattr(database, 'async_engine', primary)
+    monkeypatch.setattr(database, 'async_session', async_sessionmaker(
+        bind=primary,
+        class_=AsyncSession,
+        expire_on_commit=False,
+        autoflush=False
+    ))
+    monkeypatch.setattr(
+        database, 'replicas', ReplicaSet([replica], 'round_robin')
+    )
+
+    async with AsyncClient(
+        transport=ASGITransport(app=app),
+        base_url='http://test'
+    ) as client:
+        yield client
+
+    for engine in engines:
+        await engine.dispose()
+
+
+class TestReplicaRouting:
+    '''Test read and write session routing'''
+    def test_round_robin(self):
+        '''Test replicas are used in turn'''
+        replicas = ReplicaSet(
+            [fake_engine('a'), fake_engine('b')], 'round_robin'
+        )
+        assert [replicas.choose().name for _ in range(4)] == \
+            ['a', 'b', 'a', 'b']
+
+    def test_least_busy(self):
+        '''Test replica with fewest checked out connections wins'''
+        replicas = ReplicaSet(
+            [fake_engine('a', 3), fake_engine('b', 1), fake_engine('c', 2)],
+            'least_busy'
+        )
+        assert {replicas.choose().name for _ in range(3)} == {'b'}
+
+    def test_no_replicas(self):
+        '''Test empty set leaves reads to primary'''
+        assert ReplicaSet([], 'round_robin').choose() is None
+
+    @pytest.mark.asyncio
+    async def test_reads_go_to_replica(self, replicated: AsyncClient):
+        '''Test writes land on primary and reads on replica'''
+        created = await replicated.post(
+            '/manufacturers', json={'name': 'toyota'}
+        )
+        assert created.status_code == 201
+
+        response = await replicated.get('/manufacturers')
+        assert response.json()['items'] == []
+
+    @pytest.mark.asyncio
+    async def test_read_your_writes(
+        self,
+        replicated: AsyncClient,
+        monkeypatch
+    ):
+        '''Test client reads from primary right after its write'''
+        monkeypatch.setattr(settings, 'READ_YOUR_WRITES_SECONDS', 5)
+        await replicated.post('/manufacturers', json={'name': 'toyota'})
+        assert database.READ_YOUR_WRITES_COOKIE in replicated.cookies
+
+        response = await replicated.get('/manufacturers')
+        assert response.json()['items'][0]['name'] == 'toyota'
+
+        replicated.cookies.clear()
+        response = await replicated.get('/manufacturers')
+        assert response.json()['items'] == []
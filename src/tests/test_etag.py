@@ -0,0 +1,98 @@
+'''Module for testing conditional requests'''
+import pytest
+from httpx import AsyncClient
+
+
+@pytest.fixture
+def sample_car():
+    '''Sample for testing car'''
+    return {
+        'name': 'test-car',
+        'color': 'red',
+        'price': '3000.00',
+        'manufacturer_name': 'test-manufacturer'
+    }
+
+
+class TestConditionalGet:
+    '''Test ETag and If-None-Match handling'''
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize('path', ['/cars', '/manufacturers'])
+    async def test_list_not_modified(
+        self,
+        client: AsyncClient,
+        sample_car: dict[str, str],
+        path: str
+    ):
+        '''Test unchanged list is answered with 304'''
+        await client.post('/cars', json=sample_car)
+        first = await client.get(path)
+        etag = first.headers['etag']
+
+        second = await client.get(path, headers={'If-None-Match': etag})
+        assert second.status_code == 304
+        assert second.headers['etag'] == etag
+        assert second.content == b''
+
+    @pytest.mark.asyncio
+    async def test_list_etag_changes_after_write(
+        self,
+        client: AsyncClient,
+        sample_car: dict[str, str]
+    ):
+        '''Test writes bump the version behind list ETag'''
+        created = (await client.post('/cars', json=sample_car)).json()
+        etag = (await client.get('/cars')).headers['etag']
+
+        await client.put(
+            f"/manufacturers/{created['manufacturer_id']}",
+            json={'name': 'renamed'}
+        )
+        response = await client.get('/cars', headers={'If-None-Match': etag})
+        assert response.status_code == 200
+        assert response.headers['etag'] != etag
+        assert response.json()['items'][0]['manufacturer_name'] == 'renamed'
+
+    @pytest.mark.asyncio
+    async def test_list_etag_depends_on_query(
+        self,
+        client: AsyncClient,
+        sample_car: dict[str, str]
+    ):
+        '''Test different filters have different ETags'''
+        await client.post('/cars', json=sample_car)
+        etag = (await client.get('/cars')).headers['etag']
+
+        response = await client.get(
+            '/cars',
+            params={'color': 'red'},
+            headers={'If-None-Match': etag}
+        )
+        assert response.status_code == 200
+
+    @pytest.mark.asyncio
+    async def test_detail_not_modified(
+        self,
+        client: AsyncClient,
+        sample_car: dict[str, str]
+    ):
+        '''Test detail ETag follows the body'''
+        created = (await client.post('/cars', json=sample_car)).json()
+        path = f"/cars/{created['id']}"
+        etag = (await client.get(path)).headers['etag']
+
+        cached = await client.get(path, headers={'If-None-Match': etag})
+        assert cached.status_code == 304
+
+        await client.put(path, json={'color': 'blue'})
+        changed = await client.get(path, headers={'If-None-Match': etag})
+        assert changed.status_code == 200
+        assert changed.headers['etag'] != etag
+
+        manufacturer_path = f"/manufacturers/{created['manufacturer_id']}"
+        etag = (await client.get(manufacturer_path)).headers['etag']
+        response = await client.get(
+            manufacturer_path,
+            headers={'If-None-Match': f'W/{etag}, "other"'}
+        )
+        assert response.status_code == 304
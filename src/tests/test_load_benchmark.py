@@ -0,0 +1,100 @@
+'''Module for testing the load benchmark helpers'''
+import random
+import pytest
+from httpx import AsyncClient
+from ..benchmarks.load import READS, WRITES, Catalog, compare, percentile, \
+                              request_mix
+
+
+def route_stats(p95_ms: float, rps: float) -> dict:
+    '''Report entry of a route'''
+    return {'p95_ms': p95_ms, 'rps': rps}
+
+
+class TestRequestMix:
+    '''Tests for the weighted request mix'''
+    def test_weights_follow_write_ratio(self):
+        '''Test reads and writes get their shares of the weight'''
+        mix, weights = request_mix(0.2)
+        writes = {route for route, _, _ in WRITES}
+
+        assert len(mix) == len(READS) + len(WRITES)
+        assert sum(weights) == pytest.approx(1)
+        assert sum(
+            weight for (route, _, _), weight in zip(mix, weights)
+            if route in writes
+        ) == pytest.approx(0.2)
+
+    def test_weights_within_group_keep_proportions(self):
+        '''Test route weights relative to each other are preserved'''
+        mix, weights = request_mix(0.5)
+        weight = dict(zip((route for route, _, _ in mix), weights))
+
+        assert weight['GET /cars/{car_id}'] == pytest.approx(
+            3 * weight['GET /cars']
+        )
+
+    def test_read_only_mix(self):
+        '''Test zero write ratio never picks a write'''
+        mix, weights = request_mix(0)
+        assert all(
+            weight == 0 for (route, _, _), weight in zip(mix, weights)
+            if route in {route for route, _, _ in WRITES}
+        )
+
+    @pytest.mark.asyncio
+    async def test_every_route_is_served(self, client: AsyncClient):
+        '''Test each entry of the mix builds a request the API accepts'''
+        car = {
+            'name': 'camry', 'color': 'red',
+            'price': '100.00', 'manufacturer_name': 'toyota'
+        }
+        created = (await client.post('/cars', json=car)).json()
+        catalog = Catalog(
+            car_ids=(created['id'], created['id']),
+            manufacturer_ids=[created['manufacturer_id']]
+        )
+        rng = random.Random(0)
+
+        for route, _, build in READS + WRITES:
+            method, url, kwargs = build(catalog, rng)
+            response = await client.request(method, url, **kwargs)
+            assert response.status_code < 500, route
+            if route == 'POST /manufacturers':
+                assert response.status_code == 201
+                catalog.created_manufacturers.append(response.json()['id'])
+
+
+class TestReport:
+    '''Tests for percentiles and the baseline comparison'''
+    def test_percentile_nearest_rank(self):
+        '''Test percentile picks the nearest rank in milliseconds'''
+        latencies = [index / 1000 for index in range(1, 101)]
+        assert percentile(latencies, 50) == 50
+        assert percentile(latencies, 95) == 95
+        assert percentile(latencies, 100) == 100
+        assert percentile([0.002], 99) == 2
+
+    def test_compare_reports_regressions(self):
+        '''Test slower p95 and lower throughput beyond tolerance fail'''
+        baseline = {'routes': {
+            'GET /cars': route_stats(10, 100),
+            'GET /manufacturers': route_stats(10, 100),
+            'POST /cars': route_stats(10, 100),
+        }}
+        report = {'routes': {
+            'GET /cars': route_stats(13, 100),
+            'GET /manufacturers': route_stats(10, 70),
+            'POST /cars': route_stats(11.9, 81),
+            'GET /cars/search': route_stats(100, 1),
+        }}
+
+        assert compare(report, baseline, 0.2) == [
+            'GET /cars: p95 10 -> 13 ms',
+            'GET /manufacturers: rps 100 -> 70',
+        ]
+
+    def test_compare_without_baseline_routes(self):
+        '''Test routes missing from the baseline are not compared'''
+        report = {'routes': {'GET /cars': route_stats(1000, 1)}}
+        assert compare(report, {}, 0.2) == []
@@ -2,6 +2,7 @@
 # pylint: disable=redefined-outer-name
 import pytest
 from httpx import AsyncClient
+from ..settings import settings
 
 
 @pytest.fixture
@@ -123,7 +124,63 @@ class TestManufacturerGet:
         response = await client.get('/manufacturers')
         data = response.json()
         assert response.status_code == 200
-        assert len(data) == 2
+        assert len(data['items']) == 2
+
+    @pytest.mark.asyncio
+    async def test_get_manufacturers_pagination(
+        self,
+        client: AsyncClient,
+        sample_manufacturer: dict[str, str],
+        sample_manufacturer2: dict[str, str]
+    ):
+        '''Test geting manufacturers page by page'''
+        await client.post('/manufacturers', json=sample_manufacturer)
+        await client.post('/manufacturers', json=sample_manufacturer2)
+
+        first = await client.get('/manufacturers', params={'limit': 1})
+        first_data = first.json()
+        assert first.status_code == 200
+        assert first_data['items'][0]['name'] == sample_manufacturer['name']
+
+        second = await client.get('/manufacturers', params={
+            'limit': 1,
+            'cursor': first_data['next_cursor']
+        })
+        second_data = second.json()
+        assert second_data['items'][0]['name'] == sample_manufacturer2['name']
+        assert second_data['next_cursor'] is None
+
+    @pytest.mark.asyncio
+    async def test_get_manufacturers_fast_serialization(
+        self,
+        client: AsyncClient,
+        monkeypatch: pytest.MonkeyPatch
+    ):
+        '''Test fast path gives the same bytes as pydantic path'''
+        for name in ('volvo', 'лада', 'mazda'):
+            await client.post('/manufacturers', json={'name': name})
+
+        slow = await client.get('/manufacturers', params={'limit': 2})
+        monkeypatch.setattr(settings, 'FAST_SERIALIZATION', True)
+        fast = await client.get('/manufacturers', params={'limit': 2})
+
+        assert fast.status_code == 200
+        assert fast.content == slow.content
+        assert fast.headers['etag'] == slow.headers['etag']
+
+    @pytest.mark.asyncio
+    async def test_search_manufacturers(self, client: AsyncClient):
+        '''Test search by part of the name with limit'''
+        for name in ('mercedes', 'mercury', 'mazda'):
+            await client.post('/manufacturers', json={'name': name})
+
+        response = await client.get(
+            '/manufacturers/search',
+            params={'q': 'merc', 'limit': 1}
+        )
+        data = response.json()
+        assert response.status_code == 200
+        assert [manufacturer['name'] for manufacturer in data] == ['mercury']
 
 
 class TestManufacturerUpdate:
@@ -151,6 +208,108 @@ class TestManufacturerUpdate:
         assert put_data['id'] == manufacturer_id
         assert put_data['name'] == sample_manufacturer2['name']
 
+    @pytest.mark.asyncio
+    async def test_update_manufacturer_cyrillic_lowercase(
+        self,
+        client: AsyncClient,
+        sample_manufacturer
+    ):
+        '''Test rename lowercases non-ASCII names like create'''
+        post_response = await client.post(
+            '/manufacturers',
+            json=sample_manufacturer
+        )
+        manufacturer_id = post_response.json()['id']
+
+        put_response = await client.put(
+            f'/manufacturers/{manufacturer_id}',
+            json={'name': 'ЛАДА'}
+        )
+        assert put_response.status_code == 200
+        assert put_response.json()['name'] == 'лада'
+
+    @pytest.mark.asyncio
+    async def test_update_manufacturer_duplicate(
+        self,
+        client: AsyncClient,
+        sample_manufacturer,
+        sample_manufacturer2
+    ):
+        '''Test renaming manufacturer to a taken name'''
+        post_response = await client.post(
+            '/manufacturers',
+            json=sample_manufacturer
+        )
+        await client.post('/manufacturers', json=sample_manufacturer2)
+        manufacturer_id = post_response.json()['id']
+
+        put_response = await client.put(
+            f'/manufacturers/{manufacturer_id}',
+            json={'name': sample_manufacturer2['name'].upper()}
+        )
+        assert put_response.status_code == 400
+        assert put_response.json()['detail'] == \
+            'Manufacturer with that name already exists'
+
+    @pytest.mark.asyncio
+    async def test_update_manufacturer_null_name(
+        self,
+        client: AsyncClient,
+        sample_manufacturer
+    ):
+        '''Test null name is a validation error, not a taken name'''
+        post_response = await client.post(
+            '/manufacturers',
+            json=sample_manufacturer
+        )
+        put_response = await client.put(
+            f"/manufacturers/{post_response.json()['id']}",
+            json={'name': None}
+        )
+        assert put_response.status_code == 422
+
+    @pytest.mark.asyncio
+    async def test_update_manufacturer_not_found(self, client: AsyncClient):
+        '''Test updating not existing manufacturer'''
+        put_response = await client.put(
+            '/manufacturers/9999',
+            json={'name': 'missing'}
+        )
+        assert put_response.status_code == 404
+        assert put_response.json()['detail'] == 'Manufacturer not found'
+
+    @pytest.mark.asyncio
+    async def test_update_manufacturer_renames_cars(
+        self,
+        client: AsyncClient,
+        sample_manufacturer
+    ):
+        '''Test cars show the new manufacturer name'''
+        car_response = await client.post('/cars', json={
+            'name': 'car',
+            'color': 'red',
+            'price': '100.00',
+            'manufacturer_name': sample_manufacturer['name']
+        })
+        car = car_response.json()
+        await client.get(f'/cars/{car["id"]}')
+
+        await client.put(
+            f'/manufacturers/{car["manufacturer_id"]}',
+            json={'name': 'renamed'}
+        )
+        get_response = await client.get(f'/cars/{car["id"]}')
+        assert get_response.json()['manufacturer_name'] == 'renamed'
+
+        new_car_response = await client.post('/cars', json={
+            'name': 'car',
+            'color': 'red',
+            'price': '100.00',
+            'manufacturer_name': sample_manufacturer['name']
+        })
+        assert new_car_response.json()['manufacturer_id'] != \
+            car['manufacturer_id']
+
 
 class TestManufacturerDelete:
     '''Test delete operation for manufacturer'''
@@ -179,3 +338,29 @@ class TestManufacturerDelete:
         get_data = get_response.json()
         assert get_response.status_code == 404
         assert get_data['detail'] == 'Manufacturer not found'
+
+    @pytest.mark.asyncio
+    async def test_delete_manufacturer_not_found(self, client: AsyncClient):
+        '''Test deletion of not existing manufacturer'''
+        delete_response = await client.delete('/manufacturers/9999')
+        assert delete_response.status_code == 404
+        assert delete_response.json()['detail'] == 'Manufacturer not found'
+
+    @pytest.mark.asyncio
+    async def test_delete_manufacturer_with_cars(self, client: AsyncClient):
+        '''Test manufacturer with cars is kept'''
+        car_response = await client.post('/cars', json={
+            'name': 'car',
+            'color': 'red',
+            'price': '100.00',
+            'manufacturer_name': 'used'
+        })
+        manufacturer_id = car_response.json()['manufacturer_id']
+
+        delete_response = await client.delete(
+            f'/manufacturers/{manufacturer_id}'
+        )
+        assert delete_response.status_code == 400
+
+        get_response = await client.get(f'/manufacturers/{manufacturer_id}')
+        assert get_response.status_code == 200
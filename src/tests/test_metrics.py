@@ -0,0 +1,89 @@
+'''Module for testing request and database metrics'''
+import pytest
+from httpx import AsyncClient
+from ..metrics import Histogram
+
+
+def sample(body: str, prefix: str) -> float:
+    '''Value of the single line starting with prefix'''
+    [line] = [line for line in body.splitlines() if line.startswith(prefix)]
+    return float(line.rsplit(' ', 1)[1])
+
+
+class TestHistogram:
+    '''Tests for text rendering of histograms'''
+    def test_buckets_are_cumulative(self):
+        '''Test bucket counts, sum and count lines'''
+        histogram = Histogram('latency', 'Latency', ('route',), (0.1, 1))
+        for value in (0.05, 0.5, 0.7, 3):
+            histogram.observe(('/cars',), value)
+
+        assert histogram.samples() == [
+            'latency_bucket{route="/cars",le="0.1"} 1',
+            'latency_bucket{route="/cars",le="1"} 3',
+            'latency_bucket{route="/cars",le="+Inf"} 4',
+            'latency_sum{route="/cars"} 4.25',
+            'latency_count{route="/cars"} 4',
+        ]
+
+    def test_label_values_are_escaped(self):
+        '''Test quotes and backslashes in label values'''
+        histogram = Histogram('latency', 'Latency', ('route',), ())
+        histogram.observe(('/a"b\\',), 1)
+
+        assert histogram.samples()[0] == \
+            'latency_bucket{route="/a\\"b\\\\",le="+Inf"} 1'
+
+
+class TestMetricsEndpoint:
+    '''Tests for /metrics'''
+    @pytest.mark.asyncio
+    async def test_requests_grouped_by_route_template(
+        self,
+        client: AsyncClient
+    ):
+        '''Test different ids are counted in one series with status'''
+        await client.get('/cars/1')
+        await client.get('/cars/2')
+        await client.get('/missing')
+
+        response = await client.get('/metrics')
+        body = response.text
+        assert response.status_code == 200
+        assert response.headers['content-type'].startswith('text/plain')
+        assert '# TYPE http_request_duration_seconds histogram' in body
+        assert sample(
+            body,
+            'http_request_duration_seconds_count'
+            '{method="GET",route="/cars/{car_id}",status="404"}'
+        ) == 2
+        assert sample(
+            body,
+            'http_request_duration_seconds_count'
+            '{method="GET",route="unmatched",status="404"}'
+        ) == 1
+
+    @pytest.mark.asyncio
+    async def test_database_statements_counted_per_route(
+        self,
+        client: AsyncClient
+    ):
+        '''Test statement count and database time of a write'''
+        await client.post('/cars', json={
+            'name': 'camry',
+            'color': 'red',
+            'price': '1000.00',
+            'manufacturer_name': 'toyota'
+        })
+
+        body = (await client.get('/metrics')).text
+        labels = '{method="POST",route="/cars"}'
+        assert sample(
+            body, f'http_request_db_statements_total{labels}'
+        ) >= 1
+        assert sample(
+            body, f'http_request_db_duration_seconds_sum{labels}'
+        ) > 0
+        assert sample(
+            body, f'http_request_db_duration_seconds_count{labels}'
+        ) == 1
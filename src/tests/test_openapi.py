@@ -0,0 +1,41 @@
+'''Module for testing the prebuilt OpenAPI document'''
+import json
+import pytest
+from httpx import AsyncClient
+from fastapi import FastAPI
+from ..main import app
+from ..openapi import prebuilt_openapi, write_openapi
+
+
+class TestPrebuiltOpenAPI:
+    '''Tests for serving the schema written at build time'''
+    @pytest.mark.asyncio
+    async def test_prebuilt_schema_served(
+        self,
+        client: AsyncClient,
+        tmp_path,
+        monkeypatch
+    ):
+        '''Test served schema is the file and matches a generated one'''
+        path = tmp_path / 'openapi.json'
+        write_openapi(app, str(path))
+        generated = json.loads(path.read_text())
+
+        monkeypatch.setattr(app, 'openapi_schema', None)
+        monkeypatch.setattr(app, 'openapi', prebuilt_openapi(app, str(path)))
+        path.write_text(json.dumps({**generated, 'info': {'title': 'file'}}))
+
+        response = await client.get('/openapi.json')
+        assert response.status_code == 200
+        assert response.json()['info'] == {'title': 'file'}
+        assert response.json()['paths'] == generated['paths']
+        assert '/cars/{car_id}' in generated['paths']
+
+    def test_missing_file_generates_schema(self, tmp_path):
+        '''Test schema is generated when the file is absent'''
+        application = FastAPI(title='missing')
+        application.openapi = prebuilt_openapi(
+            application, str(tmp_path / 'missing.json')
+        )
+
+        assert application.openapi()['info']['title'] == 'missing'
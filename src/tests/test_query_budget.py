@@ -0,0 +1,128 @@
+'''Module for testing statement budgets of endpoints
+
+Budgets are counted on SQLite, where inserting a manufacturer and bumping
+catalog versions take statements that PostgreSQL folds into one.
+'''
+# pylint: disable=redefined-outer-name
+import logging
+import pytest
+import pytest_asyncio
+from httpx import AsyncClient
+from ..metrics import RequestMetrics, warn_repeated
+from ..settings import settings
+
+
+CAR = {
+    'name': 'camry',
+    'color': 'red',
+    'price': '1000.00',
+    'manufacturer_name': 'toyota'
+}
+
+BUDGETS = [
+    pytest.param('POST', '/cars', {'json': CAR}, 2, id='create_car'),
+    pytest.param(
+        'POST', '/cars', {'json': {**CAR, 'manufacturer_name': 'lada'}}, 3,
+        id='create_car_new_manufacturer'
+    ),
+    pytest.param(
+        'POST', '/cars/bulk', {'json': [CAR] * 10}, 3, id='create_cars_bulk'
+    ),
+    pytest.param('GET', '/cars', {}, 2, id='read_cars'),
+    pytest.param(
+        'GET', '/cars', {'params': {'manufacturer': 'toyota'}}, 2,
+        id='read_cars_by_manufacturer'
+    ),
+    pytest.param('GET', '/cars/{car_id}', {}, 1, id='read_car'),
+    pytest.param('GET', '/cars/stats', {}, 2, id='read_cars_stats'),
+    pytest.param('GET', '/cars/facets', {}, 2, id='read_cars_facets'),
+    pytest.param(
+        'GET', '/cars/search', {'params': {'q': 'cam'}}, 1, id='search_cars'
+    ),
+    pytest.param(
+        'PUT', '/cars/{car_id}', {'json': {'price': '2000.00'}}, 2,
+        id='update_car'
+    ),
+    pytest.param(
+        'PUT', '/cars/{car_id}', {'json': {'manufacturer_name': 'honda'}}, 3,
+        id='update_car_manufacturer'
+    ),
+    pytest.param('DELETE', '/cars/{car_id}', {}, 2, id='delete_car'),
+    pytest.param(
+        'POST', '/manufacturers', {'json': {'name': 'kia'}}, 3,
+        id='create_manufacturer'
+    ),
+    pytest.param('GET', '/manufacturers', {}, 2, id='read_manufacturers'),
+    pytest.param(
+        'GET', '/manufacturers/{manufacturer_id}', {}, 1,
+        id='read_manufacturer'
+    ),
+    pytest.param(
+        'GET', '/manufacturers/{manufacturer_id}/stats', {}, 1,
+        id='read_manufacturer_stats'
+    ),
+    pytest.param(
+        'PUT', '/manufacturers/{manufacturer_id}', {'json': {'name': 'tyt'}},
+        2, id='update_manufacturer'
+    ),
+    pytest.param(
+        'DELETE', '/manufacturers/{manufacturer_id}', {}, 2,
+        id='delete_manufacturer_with_cars'
+    ),
+]
+
+
+@pytest_asyncio.fixture(scope='function')
+async def query_headers(monkeypatch):
+    '''Enable statement count headers and warn on any repeated statement'''
+    monkeypatch.setattr(settings, 'DB_QUERY_HEADERS', True)
+    monkeypatch.setattr(settings, 'N_PLUS_ONE_THRESHOLD', 1)
+
+
+class TestQueryBudget:
+    '''Tests for the number of statements endpoints execute'''
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize(('method', 'url', 'kwargs', 'budget'), BUDGETS)
+    async def test_statement_budget(
+        self,
+        client: AsyncClient,
+        query_headers,
+        caplog,
+        method,
+        url,
+        kwargs,
+        budget
+    ):
+        '''Test endpoint stays in its budget without repeated statements'''
+        car = (await client.post('/cars', json=CAR)).json()
+        url = url.format(
+            car_id=car['id'], manufacturer_id=car['manufacturer_id']
+        )
+        caplog.clear()
+
+        with caplog.at_level(logging.WARNING, logger='src.metrics'):
+            response = await client.request(method, url, **kwargs)
+
+        assert response.status_code < 500
+        assert int(response.headers['x-db-queries']) <= budget
+        assert float(response.headers['x-db-time-ms']) >= 0
+        assert not caplog.records
+
+    @pytest.mark.asyncio
+    async def test_headers_disabled_by_default(self, client: AsyncClient):
+        '''Test statement headers are only sent when enabled'''
+        response = await client.get('/cars')
+        assert 'x-db-queries' not in response.headers
+
+    def test_repeated_statements_logged(self, monkeypatch, caplog):
+        '''Test statements over the N+1 threshold are logged'''
+        monkeypatch.setattr(settings, 'N_PLUS_ONE_THRESHOLD', 2)
+        metrics = RequestMetrics()
+        metrics.repeated.update({'SELECT car': 3, 'SELECT manufacturer': 2})
+
+        with caplog.at_level(logging.WARNING, logger='src.metrics'):
+            warn_repeated('GET', '/cars', metrics)
+
+        assert [record.getMessage() for record in caplog.records] == [
+            'Statement executed 3 times serving GET /cars: SELECT car'
+        ]
@@ -0,0 +1,125 @@
+'''Module for testing the slow query log'''
+# pylint: disable=redefined-outer-name
+import asyncio
+import json
+import pytest
+import pytest_asyncio
+from httpx import AsyncClient
+from sqlalchemy import event
+from .. import slow_queries
+from ..metrics import current_request
+from ..settings import settings
+from ..slow_queries import EXPLAIN_PREFIX, configure_slow_query_log, \
+                           logger, parameter_shape
+
+
+@pytest_asyncio.fixture(scope='function')
+async def slow_query_log(tmp_path, monkeypatch):
+    '''Slow query log in a temporary file, returns its path'''
+    path = tmp_path / 'slow_queries.log'
+    handler = configure_slow_query_log(str(path))
+
+    yield path
+
+    logger.removeHandler(handler)
+    handler.close()
+    monkeypatch.setattr(logger, 'propagate', True)
+
+
+def records(path) -> list[dict]:
+    '''Logged slow query records'''
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+class TestSlowQueryLog:
+    '''Tests for logging statements over the threshold'''
+    @pytest.mark.asyncio
+    async def test_statement_logged_with_route_and_shape(
+        self,
+        client: AsyncClient,
+        slow_query_log,
+        monkeypatch
+    ):
+        '''Test record has route and parameter types but no values'''
+        monkeypatch.setattr(settings, 'SLOW_QUERY_MS', 1e-9)
+
+        await client.get('/cars', params={'color': 'secret-color'})
+
+        logged = records(slow_query_log)
+        assert logged
+        assert {record['route'] for record in logged} == {'GET /cars'}
+        assert all(record['duration_ms'] >= 0 for record in logged)
+        assert any('cars' in record['statement'] for record in logged)
+        assert 'secret-color' not in slow_query_log.read_text()
+        assert 'str' in {
+            value
+            for record in logged
+            for value in record['parameters']['types'].values()
+        }
+        assert all('plan' not in record for record in logged)
+
+    @pytest.mark.asyncio
+    async def test_fast_statements_not_logged(
+        self,
+        client: AsyncClient,
+        slow_query_log,
+        monkeypatch
+    ):
+        '''Test statements under the threshold are skipped'''
+        monkeypatch.setattr(settings, 'SLOW_QUERY_MS', 10 ** 6)
+
+        await client.get('/cars')
+
+        assert records(slow_query_log) == []
+
+    @pytest.mark.asyncio
+    async def test_sampled_explain_runs_outside_request(
+        self,
+        client: AsyncClient,
+        test_engine,
+        slow_query_log,
+        monkeypatch
+    ):
+        '''Test sampled plan is logged and not counted toward the request'''
+        monkeypatch.setattr(settings, 'SLOW_QUERY_MS', 1e-9)
+        monkeypatch.setattr(settings, 'SLOW_QUERY_EXPLAIN_RATE', 1)
+        monkeypatch.setattr(slow_queries, 'EXPLAIN_DIALECTS', ('sqlite',))
+        contexts = []
+
+        def record_context(conn, cursor, statement, *args):
+            if statement.startswith(('SET LOCAL', EXPLAIN_PREFIX)):
+                contexts.append(current_request.get())
+
+        event.listen(
+            test_engine.sync_engine, 'before_cursor_execute', record_context
+        )
+        try:
+            await client.get('/cars')
+            await asyncio.gather(*slow_queries.explains)
+        finally:
+            event.remove(
+                test_engine.sync_engine, 'before_cursor_execute',
+                record_context
+            )
+
+        explained = [
+            record for record in records(slow_query_log)
+            if 'plan' in record or 'explain_error' in record
+        ]
+        assert explained
+        assert {record['route'] for record in explained} == {'GET /cars'}
+        assert contexts
+        assert all(context is None for context in contexts)
+        assert not slow_queries.explains
+
+    def test_parameter_shape(self):
+        '''Test shapes of named, positional and executemany parameters'''
+        assert parameter_shape({'name': 'bmw', 'ids': [1, 2]}, False) == {
+            'rows': 1, 'types': {'name': 'str', 'ids': 'list[2]'}
+        }
+        assert parameter_shape(('bmw', None), False) == {
+            'rows': 1, 'types': {'1': 'str', '2': 'NoneType'}
+        }
+        assert parameter_shape([('bmw',), ('kia',)], True) == {
+            'rows': 2, 'types': {'1': 'str'}
+        }
@@ -0,0 +1,124 @@
+'''Module for testing price statistics endpoints'''
+import pytest
+from httpx import AsyncClient
+from sqlmodel import SQLModel
+
+
+def car(name: str, color: str, price: str, manufacturer_name: str) -> dict:
+    '''Car creation payload'''
+    return {
+        'name': name,
+        'color': color,
+        'price': price,
+        'manufacturer_name': manufacturer_name
+    }
+
+
+class TestCarStats:
+    '''Tests for statistics kept by triggers on cars'''
+    @pytest.mark.asyncio
+    async def test_stats_follow_writes(self, client: AsyncClient):
+        '''Test statistics after create, bulk create, update and delete'''
+        first = await client.post(
+            '/cars', json=car('camry', 'red', '1000.00', 'toyota')
+        )
+        await client.post(
+            '/cars', json=car('corolla', 'red', '3000.00', 'toyota')
+        )
+        await client.post('/cars/bulk', json=[
+            car('supra', 'blue', '5000.00', 'toyota'),
+            car('civic', 'red', '2000.00', 'honda'),
+        ])
+        first_id = first.json()['id']
+        await client.put(f'/cars/{first_id}', json={'price': '4000.00'})
+
+        response = await client.get('/cars/stats')
+        data = response.json()
+        assert response.status_code == 200
+        assert data['by_color'] == [
+            {
+                'color': 'blue', 'cars': 1, 'min_price': '5000.00',
+                'avg_price': '5000.00', 'max_price': '5000.00'
+            },
+            {
+                'color': 'red', 'cars': 3, 'min_price': '2000.00',
+                'avg_price': '3000.00', 'max_price': '4000.00'
+            },
+        ]
+        assert [
+            (item['manufacturer_name'], item['cars'], item['max_price'])
+            for item in data['by_manufacturer']
+        ] == [('toyota', 3, '5000.00'), ('honda', 1, '2000.00')]
+
+        await client.delete(f'/cars/{first_id}')
+        await client.put(f'/cars/{first_id + 2}', json={'color': 'red'})
+
+        response = await client.get('/cars/stats')
+        assert response.json()['by_color'] == [{
+            'color': 'red', 'cars': 3, 'min_price': '2000.00',
+            'avg_price': '3333.33', 'max_price': '5000.00'
+        }]
+
+    @pytest.mark.asyncio
+    async def test_stats_empty(self, client: AsyncClient):
+        '''Test statistics without cars'''
+        response = await client.get('/cars/stats')
+        assert response.status_code == 200
+        assert response.json() == {'by_manufacturer': [], 'by_color': []}
+
+    @pytest.mark.asyncio
+    async def test_manufacturer_stats(self, client: AsyncClient):
+        '''Test statistics of single manufacturer'''
+        response = await client.post(
+            '/cars', json=car('camry', 'red', '1000.00', 'toyota')
+        )
+        manufacturer_id = response.json()['manufacturer_id']
+        await client.post(
+            '/cars', json=car('supra', 'blue', '2000.00', 'toyota')
+        )
+        await client.post(
+            '/cars', json=car('civic', 'red', '9000.00', 'honda')
+        )
+
+        response = await client.get(f'/manufacturers/{manufacturer_id}/stats')
+        data = response.json()
+        assert response.status_code == 200
+        assert data['total'] == {
+            'cars': 2, 'min_price': '1000.00',
+            'avg_price': '1500.00', 'max_price': '2000.00'
+        }
+        assert [item['color'] for item in data['by_color']] == ['blue', 'red']
+
+    @pytest.mark.asyncio
+    async def test_manufacturer_stats_without_cars(self, client: AsyncClient):
+        '''Test statistics of manufacturer without cars and missing one'''
+        response = await client.post('/manufacturers', json={'name': 'lada'})
+        manufacturer_id = response.json()['id']
+
+        response = await client.get(f'/manufacturers/{manufacturer_id}/stats')
+        assert response.status_code == 200
+        assert response.json() == {
+            'manufacturer_id': manufacturer_id,
+            'total': None,
+            'by_color': []
+        }
+
+        response = await client.get('/manufacturers/9999/stats')
+        assert response.status_code == 404
+
+    @pytest.mark.asyncio
+    async def test_stats_survive_repeated_create_all(
+        self,
+        client: AsyncClient,
+        test_engine
+    ):
+        '''Test create_all on an existing schema keeps triggers'''
+        async with test_engine.begin() as conn:
+            await conn.run_sync(SQLModel.metadata.create_all)
+
+        await client.post(
+            '/cars', json=car('camry', 'red', '1000.00', 'toyota')
+        )
+
+        response = await client.get('/cars/stats')
+        assert [item['cars'] for item in response.json()['by_color']] == [1]
@@ -0,0 +1,184 @@
+'''Module for testing startup warm-up and health endpoints'''
+# pylint: disable=redefined-outer-name
+import pytest
+import pytest_asyncio
+from httpx import AsyncClient, ASGITransport
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlmodel import SQLModel
+from .. import database, main, warmup
+from ..cache import manufacturer_ids
+from ..database import get_read_session
+from ..main import app
+from ..metrics import request_duration
+from ..models import Manufacturer
+from ..settings import settings
+
+
+READ_REQUESTS = (
+    ('/cars', {}),
+    ('/cars', {'sort': 'price'}),
+    ('/cars', {'sort': '-price'}),
+    ('/cars', {'sort': 'name'}),
+    ('/cars/0', {}),
+    ('/cars/stats', {}),
+    ('/cars/search', {'q': 'camry'}),
+    ('/manufacturers', {}),
+    ('/manufacturers/0', {}),
+    ('/manufacturers/0/stats', {}),
+    ('/manufacturers/search', {'q': 'toyota'}),
+)
+
+
+def record_statements(engine) -> set[str]:
+    '''Collect SQL of statements engine executes from now on'''
+    statements = set()
+
+    @event.listens_for(engine.sync_engine, 'before_cursor_execute')
+    def record(conn, cursor, statement, *args):
+        # pylint: disable=unused-argument
+        statements.add(statement)
+
+    return statements
+
+
+@pytest_asyncio.fixture
+async def pooled_engine(tmp_path, monkeypatch):
+    '''File SQLite engine with a pool of three as the primary'''
+    monkeypatch.setattr(settings, 'POOL_SIZE', 3)
+    engine = database.create_engine(
+        f'sqlite+aiosqlite:///{tmp_path / "warmup.db"}'
+    )
+    async with engine.begin() as connection:
+        await connection.run_sync(SQLModel.metadata.create_all)
+        await connection.execute(
+            Manufacturer.__table__.insert(),
+            [{'name': 'toyota'}, {'name': 'honda'}]
+        )
+
+    monkeypatch.setattr(database, 'async_engine', engine)
+    monkeypatch.setattr(database.replicas, 'engines', [])
+    monkeypatch.setattr(app.state, 'ready', False, raising=False)
+
+    yield engine
+
+    await engine.dispose()
+
+
+class TestWarmUp:
+    '''Tests for warming pools at startup'''
+    @pytest.mark.asyncio
+    async def test_every_connection_runs_reads(self, pooled_engine):
+        '''Test pool is filled and each connection prepared statements'''
+        used = set()
+
+        @event.listens_for(pooled_engine.sync_engine, 'before_cursor_execute')
+        def record(conn, cursor, statement, *args):
+            if 'FROM cars' in statement:
+                used.add(id(conn.connection.dbapi_connection))
+
+        await warmup.warm_up(app)
+
+        assert pooled_engine.pool.stats()['idle'] == 3
+        assert len(used) == 3
+        assert manufacturer_ids.get('toyota') == 1
+        assert manufacturer_ids.get('honda') == 2
+        assert app.state.ready
+
+    @pytest.mark.asyncio
+    async def test_runs_statements_of_read_endpoints(self, pooled_engine):
+        '''Test warm-up prepares what handlers execute, outside of them'''
+        recorded = record_statements(pooled_engine)
+        await warmup.warm_up(app)
+        warmed = set(recorded)
+
+        assert get_read_session not in app.dependency_overrides
+        assert not request_duration.values
+
+        async def read_session():
+            async with AsyncSession(pooled_engine) as session:
+                yield session
+
+        served = record_statements(pooled_engine)
+        app.dependency_overrides[get_read_session] = read_session
+        try:
+            async with AsyncClient(
+                transport=ASGITransport(app=app),
+                base_url='http://test'
+            ) as client:
+                for url, params in READ_REQUESTS:
+                    response = await client.get(url, params=params)
+                    assert response.status_code in (200, 404)
+        finally:
+            app.dependency_overrides.clear()
+
+        assert served
+        assert served <= warmed
+
+    @pytest.mark.asyncio
+    async def test_retries_until_database_is_up(
+        self,
+        pooled_engine,
+        monkeypatch
+    ):
+        '''Test failed warm-up is retried and readiness waits for it'''
+        attempts = []
+        warm_engine = warmup.warm_engine
+
+        async def flaky_warm_engine(*args):
+            attempts.append(app.state.ready)
+            if len(attempts) == 1:
+                raise OSError('connection refused')
+            await warm_engine(*args)
+
+        monkeypatch.setattr(warmup, 'warm_engine', flaky_warm_engine)
+        monkeypatch.setattr(settings, 'WARMUP_RETRY_SECONDS', 0)
+
+        await warmup.warm_up(app)
+
+        assert attempts == [False, False]
+        assert app.state.ready
+
+    @pytest.mark.asyncio
+    async def test_startup_waits_for_warm_up(self, monkeypatch):
+        '''Test lifespan completes startup only after warm-up'''
+        monkeypatch.setattr(app.state, 'ready', False, raising=False)
+        states = []
+
+        async def fake_warm_up(application):
+            states.append(application.state.ready)
+            application.state.ready = True
+
+        async def close_engines():
+            states.append('closed')
+
+        monkeypatch.setattr(main, 'open_engines', lambda: None)
+        monkeypatch.setattr(main, 'close_engines', close_engines)
+        monkeypatch.setattr(warmup, 'warm_up', fake_warm_up)
+
+        async with main.lifespan(app):
+            assert states == [False]
+            assert app.state.ready
+
+        assert states == [False, 'closed']
+
+
+class TestHealth:
+    '''Tests for liveness and readiness probes'''
+    @pytest.mark.asyncio
+    async def test_live(self, client: AsyncClient):
+        '''Test liveness does not depend on warm-up'''
+        response = await client.get('/health/live')
+        assert response.status_code == 200
+
+    @pytest.mark.asyncio
+    async def test_ready_after_warm_up(self, client: AsyncClient, monkeypatch):
+        '''Test readiness is 503 until warm-up finishes'''
+        monkeypatch.setattr(app.state, 'ready', False, raising=False)
+        response = await client.get('/health/ready')
+        assert response.status_code == 503
+
+        app.state.ready = True
+        response = await client.get('/health/ready')
+        assert response.status_code == 200
+        assert response.json() == {'status': 'ready'}
@@ -0,0 +1,112 @@
+'''Catalog versioning and conditional requests module'''
+import hashlib
+from fastapi import Response, status
+from sqlalchemy import Insert, Row, UpdateBase, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from .database import dialect_insert
+from .models import CatalogVersion
+
+
+CARS = 'cars'
+MANUFACTURERS = 'manufacturers'
+
+
+async def read_catalog_version(session: AsyncSession, name: str) -> int:
+    '''Current change counter of catalog table
+
+    Read it before the data, so a concurrent write can only make the
+    ETag older than the body and never the other way around.
+    '''
+    result = await session.execute(
+        select(CatalogVersion.version)
+        .where(CatalogVersion.name == name)
+    )
+    return result.scalars().first() or 0
+
+
+def catalog_versions_bump(session: AsyncSession, *names: str) -> Insert:
+    '''Statement incrementing change counters, usable as a CTE'''
+    statement = dialect_insert(session, CatalogVersion).values(
+        [{'name': name, 'version': 1} for name in sorted(set(names))]
+    )
+    return statement.on_conflict_do_update(
+        index_elements=[CatalogVersion.name],
+        set_={'version': CatalogVersion.version + 1}
+    )
+
+
+async def bump_catalog_versions(session: AsyncSession, *names: str) -> None:
+    '''Increment change counters within the current transaction
+
+    The counter row stays locked until commit, so call it right before.
+    '''
+    await session.execute(catalog_versions_bump(session, *names))
+
+
+async def execute_and_bump(
+    session: AsyncSession,
+    statement: UpdateBase,
+    *names: str
+) -> Row | None:
+    '''Run DML with RETURNING and bump change counters, return first row
+
+    On PostgreSQL both go as one statement with data-modifying CTEs.
+    '''
+    if session.bind.dialect.name == 'postgresql':
+        changed = statement.cte('changed')
+        result = await session.execute(
+            select(*changed.c).add_cte(
+                catalog_versions_bump(session, *names).cte('versions')
+            )
+        )
+        return result.first()
+
+    result = await session.execute(statement)
+    row = result.first()
+
+    if row is not None:
+        await bump_catalog_versions(session, *names)
+
+    return row
+
+
+def make_etag(*parts) -> str:
+    '''Strong entity tag digesting given parts'''
+    digest = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        digest.update(part if isinstance(part, bytes) else repr(part).encode())
+        digest.update(b'\0')
+    return f'"{digest.hexdigest()}"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    '''Whether If-None-Match header covers the entity tag'''
+    if not if_none_match:
+        return False
+
+    candidates = [tag.strip() for tag in if_none_match.split(',')]
+    return '*' in candidates or any(
+        candidate.removeprefix('W/') == etag for candidate in candidates
+    )
+
+
+def not_modified(etag: str) -> Response:
+    '''Empty 304 response carrying the entity tag'''
+    return Response(
+        status_code=status.HTTP_304_NOT_MODIFIED,
+        headers={'ETag': etag}
+    )
+
+
+def json_with_etag(body: bytes, if_none_match: str | None) -> Response:
+    '''JSON response tagged by its body digest, or 304 if client has it'''
+    etag = make_etag(body)
+
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+
+    return Response(
+        content=body,
+        media_type='application/json',
+        headers={'ETag': etag}
+    )
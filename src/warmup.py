@@ -0,0 +1,124 @@
+'''Startup warm-up module
+
+Right after start every worker opens pool connections up front and runs
+the statements of the read endpoints once on each of them, built by the
+same query functions the handlers use, so asyncpg has them prepared
+before real traffic arrives. They run on a session of their own outside
+the ASGI stack, so requests being served, metrics and response caches
+are not touched. The manufacturer id cache is loaded as well.
+The application lifespan awaits it, so a worker starts accepting
+connections on the shared socket only once it is warm, and every worker
+answering /health/ready is ready. While the database is down warm-up
+keeps retrying and the worker accepts nothing, /health/live included.
+'''
+import asyncio
+import logging
+from fastapi import FastAPI
+from sqlalchemy import select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine, \
+                                    AsyncSession
+from . import database
+from .cache import manufacturer_ids
+from .models import Manufacturer
+from .routers.cars import CAR_SORT_KEYS, car_query, cars_page_query, \
+                            cars_query, search_cars_query
+from .routers.manufacturers import manufacturer_exists_query, \
+                                    manufacturer_query, \
+                                    manufacturers_page_query, \
+                                    search_manufacturers_query
+from .settings import settings
+from .stats import car_stats, manufacturer_stats
+from .versioning import CARS, MANUFACTURERS, read_catalog_version
+
+
+logger = logging.getLogger(__name__)
+
+WARMUP_SEARCH = 'a'
+
+
+async def open_connections(
+    engine: AsyncEngine,
+    count: int
+) -> list[AsyncConnection]:
+    '''Check out count connections at once so the pool creates them'''
+    connections = [engine.connect() for _ in range(count)]
+    results = await asyncio.gather(
+        *(connection.start() for connection in connections),
+        return_exceptions=True
+    )
+
+    failed = [result for result in results if isinstance(result, Exception)]
+    if failed:
+        await asyncio.gather(*(
+            connection.close() for connection, result
+            in zip(connections, results)
+            if not isinstance(result, Exception)
+        ))
+        raise failed[0]
+
+    return connections
+
+
+async def run_reads(session: AsyncSession) -> None:
+    '''Execute statements of the read endpoints, results are discarded'''
+    await read_catalog_version(session, CARS)
+    for sort in CAR_SORT_KEYS:
+        await session.execute(cars_page_query(cars_query(), sort))
+    await session.execute(car_query(0))
+    await car_stats(session)
+    await session.execute(search_cars_query(session, WARMUP_SEARCH))
+
+    await read_catalog_version(session, MANUFACTURERS)
+    await session.execute(manufacturers_page_query())
+    await session.execute(manufacturer_query(0))
+    await manufacturer_stats(session, 0)
+    await session.execute(manufacturer_exists_query(0))
+    await session.execute(
+        search_manufacturers_query(session, WARMUP_SEARCH)
+    )
+
+
+async def warm_engine(engine: AsyncEngine, count: int) -> None:
+    '''Open count connections of engine and prepare read statements'''
+    connections = await open_connections(engine, count)
+    try:
+        for connection in connections:
+            async with AsyncSession(bind=connection) as session:
+                await run_reads(session)
+            await connection.rollback()
+    finally:
+        await asyncio.gather(
+            *(connection.close() for connection in connections)
+        )
+
+
+async def preload_manufacturers(engine: AsyncEngine) -> None:
+    '''Fill the manufacturer id cache'''
+    async with engine.connect() as connection:
+        result = await connection.execute(
+            select(Manufacturer.name, Manufacturer.id)
+            .order_by(Manufacturer.id)
+            .limit(manufacturer_ids.maxsize)
+        )
+        for name, manufacturer_id in result:
+            manufacturer_ids.set(name, manufacturer_id)
+
+
+async def warm_up(app: FastAPI) -> None:
+    '''Warm pools of all engines, retrying until the database is up'''
+    engines = [database.async_engine, *database.replicas.engines]
+
+    while True:
+        try:
+            for engine in engines:
+                await warm_engine(
+                    engine, settings.WARMUP_CONNECTIONS or engine.pool.size()
+                )
+            await preload_manufacturers(database.async_engine)
+            break
+        except (OSError, SQLAlchemyError) as exc:
+            logger.warning('Warm-up failed, retrying: %s', exc)
+            await asyncio.sleep(settings.WARMUP_RETRY_SECONDS)
+
+    app.state.ready = True